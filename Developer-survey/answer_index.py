@@ -0,0 +1,97 @@
+"""Индекс ответов для категорий с множественными вариантами, разделенными ';'.
+Столбец разбирается один раз и хранится в виде разреженной матрицы
+"респондент x вариант ответа" со словарем вариантов. Подсчет ответов,
+доли крупнейших групп и средний доход с навыком и без него вычисляются
+векторными операциями над матрицей без повторного разбора строк.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from survey_loader import iter_frames, cached_result
+from stage_trace import stage
+
+
+class AnswerIndex:
+    """Разреженная матрица ответов (строки - респонденты в порядке следования
+    в источнике данных, столбцы - варианты ответа из словаря options)."""
+
+    def __init__(self, matrix, options: np.ndarray, answered: np.ndarray):
+        self.matrix = matrix  # csr-матрица типа bool: респондент x вариант ответа
+        self.options = options  # словарь вариантов ответа (номер столбца -> вариант)
+        self.answered = answered  # маска респондентов, ответивших на вопрос
+        self.n_respondents = int(answered.sum())  # количество ответивших респондентов
+
+    @classmethod
+    @stage(name='AnswerIndex.from_source')
+    def from_source(cls, source, cat: str):
+        """Функция строит индекс по столбцу cat датафрейма или SurveyReader,
+        разбирая строки с разделителями поблочно."""
+        vocabulary = {}  # вариант ответа -> номер столбца матрицы
+        rows, cols, answered = [], [], []
+        n_rows = 0
+        for chunk in iter_frames(source, [cat]):
+            # Столбец без ответов в датафрейме имеет тип float64:
+            answers = chunk[cat].reset_index(drop=True).astype('str')
+            answered.append(answers.notna().to_numpy())
+            # Позиционный индекс после explode указывает на строку респондента:
+            options = answers.str.split(';').explode().dropna()
+            for option in options.unique():
+                vocabulary.setdefault(option, len(vocabulary))
+            rows.append(options.index.to_numpy(dtype=np.int64) + n_rows)
+            cols.append(options.map(vocabulary).to_numpy(dtype=np.int64))
+            n_rows += len(answers)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)),
+                                   shape=(n_rows, len(vocabulary)))
+        answered = np.concatenate(answered) if answered else np.empty(0, dtype=bool)
+        return cls(matrix, np.array(list(vocabulary), dtype=object), answered)
+
+    def counts(self) -> pd.Series:
+        """Функция возвращает количество ответов по каждому варианту,
+        отсортированное по убыванию."""
+        counts = np.asarray(self.matrix.sum(axis=0)).ravel()
+        return pd.Series(counts, index=self.options).sort_values(ascending=False)
+
+    def option_columns(self, skill: str) -> np.ndarray:
+        """Функция возвращает номера столбцов матрицы, соответствующих skill:
+        точное совпадение с вариантом ответа, а при его отсутствии - варианты,
+        содержащие skill как отдельное слово ('manager' -> 'Engineering manager',
+        но 'Java' не совпадает с 'JavaScript')."""
+        exact = np.flatnonzero(self.options == skill)
+        if len(exact):
+            return exact
+        pattern = re.compile(rf'(?<!\w){re.escape(skill)}(?!\w)')
+        return np.array([i for i, option in enumerate(self.options) if pattern.search(option)],
+                        dtype=np.int64)
+
+    def has_skill(self, skill: str) -> np.ndarray:
+        """Функция возвращает маску респондентов, указавших skill."""
+        indicator = np.zeros(len(self.options), dtype=np.int8)
+        indicator[self.option_columns(skill)] = 1
+        return (self.matrix @ indicator) > 0
+
+    def income_means(self, income: np.ndarray, skill: str):
+        """Функция вычисляет средний доход income среди ответивших респондентов
+        с навыком skill и без него. Возвращает пару (с навыком, без навыка)."""
+        valid = self.answered & ~np.isnan(income)
+        mask = self.has_skill(skill)
+        with_skill = valid & mask
+        without_skill = valid & ~mask
+        income_with_skill = income[with_skill].mean() if with_skill.any() else np.nan
+        income_without_skill = income[without_skill].mean() if without_skill.any() else np.nan
+        return income_with_skill, income_without_skill
+
+
+def get_answer_index(source, cat: str) -> AnswerIndex:
+    """Функция возвращает индекс ответов для столбца cat источника source
+    (датафрейма или SurveyReader), построенный при первом обращении.
+    Если строки датафрейма или данные столбца с тех пор изменились,
+    индекс строится заново."""
+    return cached_result(source, ('answer_index', cat), [cat],
+                         lambda: AnswerIndex.from_source(source, cat))
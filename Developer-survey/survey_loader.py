@@ -0,0 +1,176 @@
+"""Загрузка и поблочная агрегация данных опроса разработчиков Stack Overflow.
+Из csv-файла считываются только запрошенные столбцы с компактными типами данных,
+что позволяет обрабатывать многолетние выгрузки объемом в несколько ГБ.
+"""
+
+import weakref
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+# Текстовые значения в числовых столбцах ('YearsCode', 'YearsCodePro') и их числовые эквиваленты:
+MIXED_VALUES = {'Less than 1 year': 0.5, 'More than 50 years': 51}
+
+# Столбцы с множественными вариантами ответа, разделенными ';':
+MULTIPLE_ANSWER_COLUMNS = ['DevType', 'Gender', 'Ethnicity', 'Sexuality', 'JobFactors',
+                           'LanguageWorkedWith', 'LanguageDesireNextYear',
+                           'DatabaseWorkedWith', 'DatabaseDesireNextYear',
+                           'PlatformWorkedWith', 'PlatformDesireNextYear',
+                           'WebframeWorkedWith', 'WebframeDesireNextYear',
+                           'MiscTechWorkedWith', 'MiscTechDesireNextYear',
+                           'NEWCollabToolsWorkedWith', 'NEWCollabToolsDesireNextYear',
+                           'NEWJobHunt', 'NEWJobHuntResearch', 'NEWPurchaseResearch',
+                           'NEWSOSites', 'NEWStuck']
+
+# Компактные типы данных для столбцов опроса (остальные столбцы считываются
+# с автоматическим определением типа). Столбцы с множественными вариантами
+# всегда считываются как строки: иначе блок, в котором столбец не заполнен,
+# получает тип float64:
+SURVEY_DTYPES = {'Country': 'category', 'EdLevel': 'category', 'OrgSize': 'category',
+                 'Employment': 'category', 'NEWLearn': 'category',
+                 'ConvertedComp': 'float32', 'WorkWeekHrs': 'float32',
+                 **{col: 'str' for col in MULTIPLE_ANSWER_COLUMNS}}
+
+
+@stage
+def load_survey(path: str, columns=None, chunksize=None):
+    """Функция считывает из csv-файла path только столбцы columns
+    (все столбцы, если columns=None) с компактными типами данных.
+    Если указан chunksize, возвращает итератор по блокам из chunksize строк,
+    иначе - датафрейм целиком."""
+    dtype = {col: col_type for col, col_type in SURVEY_DTYPES.items()
+             if columns is None or col in columns}
+    return pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize)
+
+
+class SurveyReader:
+    """Источник данных для поблочной обработки файла опроса.
+    Каждый вызов chunks() заново читает файл, загружая только
+    столбцы, необходимые конкретной функции анализа."""
+
+    def __init__(self, path: str, chunksize: int = 100_000):
+        self.path = path  # путь к csv-файлу
+        self.chunksize = chunksize  # количество строк в одном блоке
+
+    def chunks(self, columns: list):
+        """Функция возвращает итератор по блокам со столбцами columns."""
+        return load_survey(self.path, columns=columns, chunksize=self.chunksize)
+
+
+def iter_frames(source, columns: list):
+    """Функция возвращает последовательность датафреймов для агрегации:
+    сам датафрейм, если source - pd.DataFrame, или блоки файла,
+    если source - SurveyReader."""
+    if isinstance(source, pd.DataFrame):
+        return [source]
+    return source.chunks(columns)
+
+
+def count_unique_answers(source, cat: str) -> pd.Series:
+    """Функция подсчитывает количество ответов в категории cat,
+    где каждая ячейка имеет не более одного варианта ответа.
+    Возвращает серию, отсортированную по убыванию."""
+    counts = Counter()
+    for chunk in iter_frames(source, [cat]):
+        by_groups = chunk[cat].value_counts()
+        counts.update(by_groups[by_groups > 0].to_dict())
+    return pd.Series(counts, dtype='int64').sort_values(ascending=False)
+
+
+def income_stats_by_cat(source, cat: str):
+    """Функция вычисляет средний уровень дохода ('ConvertedComp')
+    для каждого значения категорийного столбца cat и медиану дохода
+    по всем респондентам. Возвращает серию средних значений и медиану."""
+    sums = []  # Суммы и количество значений дохода по блокам
+    incomes = []  # Заполненные значения дохода (float32) для расчета медианы
+    for chunk in iter_frames(source, ['ConvertedComp', cat]):
+        income = chunk['ConvertedComp'].astype('float64')
+        by_cat = income.groupby(chunk[cat], observed=True).agg(['sum', 'count'])
+        by_cat.index = by_cat.index.astype(object)
+        sums.append(by_cat)
+        incomes.append(chunk['ConvertedComp'].dropna().to_numpy())
+    totals = pd.concat(sums).groupby(level=0).sum()
+    mean_income = totals['sum'] / totals['count']
+    incomes = np.concatenate(incomes)
+    median_income = float(np.median(incomes)) if len(incomes) else np.nan
+    return mean_income, median_income
+
+
+# Кэш результатов обработки: id источника -> (слабая ссылка на источник,
+# индекс строк датафрейма на момент обработки, словарь с результатами)
+_source_cache = {}
+
+
+def source_cache(source) -> dict:
+    """Функция возвращает словарь для хранения результатов обработки
+    источника source (датафрейма или SurveyReader). Если строки датафрейма
+    изменились, возвращается новый пустой словарь."""
+    row_index = source.index if isinstance(source, pd.DataFrame) else None
+    key = id(source)
+    entry = _source_cache.get(key)
+    if entry is None or entry[0]() is not source or entry[1] is not row_index:
+        # Запись удаляется из кэша вместе с источником данных:
+        entry = (weakref.ref(source, lambda _: _source_cache.pop(key, None)), row_index, {})
+        _source_cache[key] = entry
+    return entry[2]
+
+
+def _same_data(cached: pd.Series, current: pd.Series) -> bool:
+    """Функция проверяет, что серии cached и current ссылаются на одни и те же данные.
+    Серия cached хранится в кэше, поэтому ее память не может быть освобождена
+    и занята новыми данными, а запись в столбец датафрейма при наличии
+    такой ссылки (copy-on-write) создает копию данных столбца."""
+    if cached is None or current is None:
+        return cached is current
+    if cached.array is current.array:
+        return True
+    if not isinstance(cached.array, pd.arrays.NumpyExtensionArray):
+        return False
+    old, new = cached.to_numpy().__array_interface__, current.to_numpy().__array_interface__
+    return all(old[key] == new[key] for key in ('typestr', 'shape', 'strides')) and old['data'][0] == new['data'][0]
+
+
+def cached_result(source, key: tuple, columns: list, build):
+    """Функция возвращает результат обработки key столбцов columns источника
+    source из кэша или вычисляет его вызовом build(). Результат вычисляется
+    заново, если с момента расчета изменились данные хотя бы одного из столбцов
+    (например, столбец датафрейма был заменен или изменен)."""
+    cache = source_cache(source)
+    data = [source[col] if isinstance(source, pd.DataFrame) else None for col in columns]
+    entry = cache.get(key)
+    if entry is None or not all(_same_data(old, new) for old, new in zip(entry[0], data)):
+        entry = (data, build())
+        cache[key] = entry
+    return entry[1]
+
+
+def text_to_number(df: pd.DataFrame, cat: str) -> pd.Series:
+    """Функция преобразует значения столбца, содержащего смешанные
+    числовые и текстовые значения, к числовым значениям.
+    Возвращает новую серию, исходный датафрейм не изменяется."""
+    return pd.to_numeric(df[cat].replace(MIXED_VALUES), errors='coerce')
+
+
+def numeric_column(source, cat: str, mixed=False) -> np.ndarray:
+    """Функция возвращает значения столбца cat в виде массива float64
+    (с пропусками np.nan). Если mixed=True, текстовые значения
+    преобразуются к числовым. Результат вычисляется один раз
+    и сохраняется в кэше источника."""
+    def build():
+        parts = []
+        for chunk in iter_frames(source, [cat]):
+            values = text_to_number(chunk, cat) if mixed else chunk[cat]
+            parts.append(values.to_numpy(dtype='float64', na_value=np.nan))
+        return np.concatenate(parts) if parts else np.empty(0)
+    return cached_result(source, ('numeric', cat, mixed), [cat], build)
+
+
+def na_mask(source, cat: str, mixed=False) -> np.ndarray:
+    """Функция возвращает маску пропусков в числовом столбце cat
+    (сохраняется в кэше источника вместе со значениями)."""
+    return cached_result(source, ('na_mask', cat, mixed), [cat],
+                         lambda: np.isnan(numeric_column(source, cat, mixed)))
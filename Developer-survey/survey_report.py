@@ -0,0 +1,115 @@
+"""Пакетное построение отчета по опросу разработчиков без участия пользователя.
+Графики из перечня анализов (по умолчанию dev_survey_2020.ANALYSES) строятся
+с неинтерактивным backend'ом matplotlib в нескольких процессах и сохраняются
+в файлы PNG/SVG. Время построения каждого графика записывается в timings.json.
+
+Пример запуска:
+    python survey_report.py survey_results_public.csv report --format png svg --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')  # Неинтерактивный backend: plt.show() не блокирует выполнение
+import matplotlib.pyplot as plt
+
+from dev_survey_2020 import (ANALYSES, USED_COLUMNS, sort_multiple_answers, income_impact,
+                             sort_continuous_values, income_correlation)
+from survey_loader import load_survey, na_mask
+from answer_index import get_answer_index
+
+# Данные и перечень анализов рабочего процесса (при запуске через fork
+# наследуются от родительского процесса вместе с кэшем обработанных столбцов):
+_data = None
+_analyses = None
+
+
+def chart_name(number: int, analysis, params: dict) -> str:
+    """Функция формирует имя файла графика из порядкового номера,
+    названия функции анализа и значений параметров cat и skill."""
+    parts = [f'{number:02d}', analysis.__name__, params['cat']]
+    if 'skill' in params:
+        parts.append(params['skill'])
+    return '_'.join(parts).replace(' ', '-').replace('/', '-')
+
+
+def _init_worker(path: str, analyses: list):
+    """Инициализация рабочего процесса: при запуске через spawn
+    данные загружаются в каждом процессе заново."""
+    global _data, _analyses
+    _analyses = analyses
+    if _data is None:
+        _data = load_survey(path, columns=USED_COLUMNS)
+
+
+def _render_chart(task: tuple) -> dict:
+    """Функция строит один график из перечня _analyses и сохраняет его
+    в каталог out_dir в каждом из форматов formats.
+    Возвращает сведения о файлах и времени построения."""
+    number, out_dir, formats = task
+    analysis, params = _analyses[number]
+    name = chart_name(number, analysis, params)
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        # Agg не отображает окна и предупреждает об этом при вызове plt.show()
+        warnings.filterwarnings('ignore', message='.*non-interactive.*')
+        analysis(_data, **params)
+    fig = plt.gcf()
+    files = []
+    for fmt in formats:
+        file_path = os.path.join(out_dir, f'{name}.{fmt}')
+        fig.savefig(file_path, format=fmt)
+        files.append(file_path)
+    plt.close('all')
+    return {'chart': name, 'files': files, 'seconds': round(time.perf_counter() - start, 4)}
+
+
+def render_report(path: str, out_dir: str, analyses=None, formats=('png',), workers=None) -> list:
+    """Функция строит все графики из перечня analyses (список пар
+    (функция, параметры)) по данным из файла path и сохраняет их
+    в каталог out_dir. Индексы ответов с множественными вариантами
+    и очищенные числовые столбцы строятся один раз до распределения
+    графиков по workers процессам.
+    Возвращает список со временем построения каждого графика,
+    который также сохраняется в файл timings.json."""
+    global _data, _analyses
+    analyses = ANALYSES if analyses is None else analyses
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    _data = load_survey(path, columns=USED_COLUMNS)
+    _analyses = analyses
+    for analysis, params in analyses:
+        if analysis in (sort_multiple_answers, income_impact):
+            get_answer_index(_data, params['cat'])
+        elif analysis in (sort_continuous_values, income_correlation):
+            na_mask(_data, params['cat'], params.get('mixed', False))
+    na_mask(_data, 'ConvertedComp')
+    load_seconds = round(time.perf_counter() - start, 4)
+
+    tasks = [(number, out_dir, tuple(formats)) for number in range(len(analyses))]
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with context.Pool(workers, initializer=_init_worker, initargs=(path, analyses)) as pool:
+        timings = pool.map(_render_chart, tasks)
+
+    report = {'load_seconds': load_seconds, 'total_seconds': round(time.perf_counter() - start, 4),
+              'charts': timings}
+    with open(os.path.join(out_dir, 'timings.json'), 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакетное построение графиков по опросу разработчиков')
+    parser.add_argument('path', help='csv-файл с результатами опроса')
+    parser.add_argument('out_dir', help='каталог для сохранения графиков')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg'], dest='formats')
+    parser.add_argument('--workers', type=int, default=None, help='количество процессов')
+    args = parser.parse_args()
+    for chart in render_report(args.path, args.out_dir, formats=args.formats, workers=args.workers):
+        print(f"{chart['chart']}: {chart['seconds']} сек.")
@@ -10,15 +10,16 @@ from sklearn import metrics
 
 import matplotlib.pyplot as plt
 
-# Считываем исходные данные:
-dollar = pd.read_excel('USD_Rub.xlsx', usecols=['data', 'curs'])
-dollar = dollar.rename(columns={'data':'Date'})
+from market_data import load_series
+from time_join import join_on_date
+from online_model import walk_forward
 
-gold = pd.read_csv('Gold_Rub.csv')
-gold['Date'] = pd.to_datetime(gold['Date'], format='%Y%m%d')
+# Считываем исходные данные (через колоночный кэш, см. market_data.py):
+dollar = load_series('dollar')[['Date', 'curs']]
+gold = load_series('gold')
 
 # Объединяем данные, соотнося их по дате:
-data = pd.merge(dollar, gold, on='Date')
+data = join_on_date([dollar, gold])
 
 print('Корреляция между курсом доллара и стоимостью золота:', data['curs'].corr(data['Price']))
 
@@ -55,6 +56,17 @@ print(f'\nСредняя абсолютная ошибка (MAE): {av_err}')
 
 # Выводим парами фактические данные и прогноз
 # с поправкой на стабильно наблюдаемое отклонение:
+corrected = pd.DataFrame({'Дата': test['Date'].to_numpy(), 'Прогноз': y_pred - av_err, 'Факт': y_test})
+corrected['Разница'] = corrected['Прогноз'] / corrected['Факт'] - 1
 print('\nСкорректированный прогноз с поправкой на MAE:')
-for i in range(len(y_pred)):
-    print(f'Прогноз: {y_pred[i] - av_err} Факт: {y_test[i]} Разница: {(y_pred[i] - av_err) / y_test[i] - 1}')
+print(corrected.to_string(index=False))
+
+# Пошаговая проверка (walk-forward): на каждый день тестового периода модель
+# обучается на всех предшествующих наблюдениях, поправка пересчитывается
+# по отклонениям прогнозов за предыдущие дни (см. online_model.py).
+# Для ежедневного обновления прогноза используется OnlineLinearRegression.update().
+backtest = walk_forward(data['Price'], data['curs'], n_train=len(train))
+backtest.insert(0, 'Date', test['Date'].to_numpy())
+backtest.to_csv('walk_forward_forecast.csv', index=False)
+print('\nСредняя абсолютная ошибка пошагового прогноза с поправкой (MAE):',
+      metrics.mean_absolute_error(backtest['actual'], backtest['corrected']))
@@ -1,53 +1,50 @@
-import pandas as pd
 from matplotlib import pyplot as plt
 
-# Считываем исходные данные из 4 файлов:
-dollar = pd.read_excel('USD_Rub.xlsx')
-euro = pd.read_excel('Euro_Rub.xlsx')
-brent = pd.read_csv('Brent_USD.csv')
-gold = pd.read_csv('Gold_Rub.csv')
+from market_data import load_series
+from time_join import join_on_date
+from rolling_corr import regime_correlation
 
-# Преобразуем дату в формат datetime, где это необходимо:
-gold['Date'] = pd.to_datetime(gold['Date'], format='%Y%m%d')
-brent['Date'] = pd.to_datetime(brent['Date'], format='%Y%m%d')
+# Считываем исходные данные из 4 файлов (через колоночный кэш,
+# даты уже преобразованы в формат datetime и находятся в столбце 'Date'):
+dollar = load_series('dollar')
+euro = load_series('euro')
+brent = load_series('brent')
+gold = load_series('gold')
 
 # Переименовываем столбцы для последующего объединения данных в одну таблицу:
-dollar = dollar.rename({'nominal': 'Dollar_nominal', 'data': 'Date',
-                        'curs': 'Dollar_rate', 'cdx': 'Dollar_cdx'}, axis='columns')
-euro = euro.rename({'nominal': 'Euror_nominal', 'data': 'Date',
-                    'curs': 'Euro_rate', 'cdx': 'Euro_cdx'}, axis='columns')
+dollar = dollar.rename({'nominal': 'Dollar_nominal', 'curs': 'Dollar_rate'}, axis='columns')
+euro = euro.rename({'nominal': 'Euror_nominal', 'curs': 'Euro_rate'}, axis='columns')
 gold = gold.rename({'Price': 'Gold_price'}, axis='columns')
-brent = brent.rename({'Ticker': 'Brent_Ticker', 'PER': 'Brent_per', 'Time': 'Brent_time',
+brent = brent.rename({'Time': 'Brent_time',
                       'Open': 'Brent_open', 'High': 'Brent_high', 'Low': 'Brent_low',
                       'Close': 'Brent_close', 'Vol': 'Brent_vol'}, axis='columns')
 
-# Объединяем исходные данные в две базы, соотнося их по дате:
-data_cur = pd.merge(dollar, euro, on='Date')
-data_cur = pd.merge(data_cur, brent, on='Date')  # База 1 - курсы валют и цены на нефть.
+# Объединяем исходные данные в две базы, соотнося их по дате
+# (ряды уже отсортированы по дате, поэтому результат также упорядочен по дате):
+data_cur = join_on_date([dollar, euro, brent])  # База 1 - курсы валют и цены на нефть.
 
-data_gold = pd.merge(data_cur, gold, on='Date')  # База 2 - с включением цен на золото
+data_gold = join_on_date([dollar, euro, brent, gold])  # База 2 - с включением цен на золото
 # (динамика цен на золото доступна с 2008 г., поэтому все предшествующие периоды в ней отсутствуют).
-
-# Сортируем данные по значениям в столбце 'Date':
-data_cur.sort_values(by='Date')
-data_gold.sort_values(by='Date')
+# Для сохранения дат, в которые одна из бирж не работала, можно использовать
+# join_on_date(..., how='asof', tolerance='5D') с последними известными значениями.
 
 # Вычисляем коэффициенты корреляции:
 
 print('Коэффициент корреляции (курс доллара / цена на нефть):\n\tза весь период:',
       round(data_cur['Brent_close'].corr(data_cur.Dollar_rate), 3))
 
-data_08_14 = data_cur[data_cur.Date.dt.year < 2008]
+# Корреляция по периодам (до 2008 г., 2008-2017 гг., с 2018 г.) за один проход по данным:
+before_08, from_08_to_17, from_18 = regime_correlation(data_cur, ['Brent_close', 'Dollar_rate'],
+                                                       breakpoints=['2008-01-01', '2018-01-01'])
 print('\tдо 2007 г.:',
-      round(data_08_14['Brent_close'].corr(data_08_14.Dollar_rate), 3))
-
-data_08_14 = data_cur[(data_cur.Date.dt.year > 2007) & (data_cur.Date.dt.year < 2018)]
+      round(before_08.loc['Brent_close', 'Dollar_rate'], 3))
 print('\tв 2008-2017 гг.:',
-      round(data_08_14['Brent_close'].corr(data_08_14.Dollar_rate), 3))
-
-data_15 = data_cur[data_cur.Date.dt.year > 2017]
+      round(from_08_to_17.loc['Brent_close', 'Dollar_rate'], 3))
 print('\tс 2018 г.:',
-      round(data_15['Brent_close'].corr(data_15.Dollar_rate), 3))
+      round(from_18.loc['Brent_close', 'Dollar_rate'], 3))
+
+# Для скользящей корреляции по окну и добавления новых ежедневных наблюдений
+# без пересчета истории см. rolling_corr.RollingCorrelation.
 
 print('\nКоэффициент корреляции (курс доллара / цена на золото):',
       round(data_gold['Gold_price'].corr(data_gold.Dollar_rate), 3))
@@ -0,0 +1,107 @@
+"""Общий модуль доступа к исходным данным о курсах валют, ценах на нефть и золото.
+Каждый исходный файл (xlsx или csv) преобразуется один раз в колоночный кэш:
+массив дат datetime64 и столбцы float64 в формате .npy, которые затем
+считываются (или отображаются в память, mmap=True) без повторного разбора файлов.
+Кэш обновляется при изменении исходного файла (время изменения, размер и хэш).
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from dataset_cache import file_hash
+from stage_trace import stage
+
+# Каталог с исходными файлами и кэшем:
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Описание исходных файлов: имя файла, столбец с датой и формат даты (для csv):
+SOURCES = {
+    'dollar': {'file': 'USD_Rub.xlsx', 'date_column': 'data'},
+    'euro': {'file': 'Euro_Rub.xlsx', 'date_column': 'data'},
+    'brent': {'file': 'Brent_USD.csv', 'date_column': 'Date', 'date_format': '%Y%m%d'},
+    'gold': {'file': 'Gold_Rub.csv', 'date_column': 'Date', 'date_format': '%Y%m%d'},
+}
+
+
+def _read_source(name: str) -> pd.DataFrame:
+    """Функция считывает исходный файл name и возвращает датафрейм
+    со столбцом 'Date' (по возрастанию) и числовыми столбцами float64.
+    Текстовые столбцы (наименование валюты, тикер) не сохраняются."""
+    source = SOURCES[name]
+    path = os.path.join(DATA_DIR, source['file'])
+    if path.endswith('.xlsx'):
+        df = pd.read_excel(path)
+        dates = pd.to_datetime(df[source['date_column']])
+    else:
+        df = pd.read_csv(path)
+        dates = pd.to_datetime(df[source['date_column']].astype(str), format=source['date_format'])
+    values = df.drop(columns=source['date_column']).select_dtypes('number').astype('float64')
+    values.insert(0, 'Date', dates.astype('datetime64[ns]'))
+    return values.sort_values(by='Date', kind='stable').reset_index(drop=True)
+
+
+def _cache_is_valid(path: str, meta_path: str) -> bool:
+    """Функция проверяет, соответствует ли кэш исходному файлу path.
+    Хэш вычисляется только при изменении времени изменения или размера файла."""
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, encoding='utf-8') as file:
+        meta = json.load(file)
+    stat = os.stat(path)
+    if meta['mtime'] == stat.st_mtime and meta['size'] == stat.st_size:
+        return True
+    if meta['size'] != stat.st_size or meta['sha256'] != file_hash(path):
+        return False
+    # Файл не изменился по содержанию (например, был скопирован):
+    meta['mtime'] = stat.st_mtime
+    with open(meta_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    return True
+
+
+@stage
+def build_cache(name: str):
+    """Функция преобразует исходный файл name в колоночный кэш."""
+    path = os.path.join(DATA_DIR, SOURCES[name]['file'])
+    cache_path = os.path.join(CACHE_DIR, name)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.makedirs(cache_path)
+    df = _read_source(name)
+    for col in df.columns:
+        np.save(os.path.join(cache_path, f'{col}.npy'), df[col].to_numpy())
+    stat = os.stat(path)
+    meta = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': file_hash(path),
+            'columns': df.columns.to_list()}
+    # Файл с описанием записывается последним и служит признаком готовности кэша:
+    with open(os.path.join(cache_path, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+
+def load_arrays(name: str, mmap: bool = False) -> dict:
+    """Функция возвращает словарь {столбец: массив} для источника name.
+    Если mmap=True, массивы отображаются в память из кэша только для чтения,
+    иначе считываются в память. Кэш создается или обновляется при необходимости."""
+    path = os.path.join(DATA_DIR, SOURCES[name]['file'])
+    cache_path = os.path.join(CACHE_DIR, name)
+    meta_path = os.path.join(cache_path, 'meta.json')
+    if not _cache_is_valid(path, meta_path):
+        build_cache(name)
+    with open(meta_path, encoding='utf-8') as file:
+        columns = json.load(file)['columns']
+    mmap_mode = 'r' if mmap else None
+    return {col: np.load(os.path.join(cache_path, f'{col}.npy'), mmap_mode=mmap_mode) for col in columns}
+
+
+@stage
+def load_series(name: str, mmap: bool = False) -> pd.DataFrame:
+    """Функция возвращает данные источника name ('dollar', 'euro', 'brent', 'gold')
+    в виде датафрейма со столбцом 'Date' и числовыми столбцами исходного файла.
+    Если mmap=True, столбцы отображаются в память из кэша без копирования,
+    и датафрейм доступен только для чтения (изменение значений - ValueError)."""
+    return pd.DataFrame(load_arrays(name, mmap), copy=False)
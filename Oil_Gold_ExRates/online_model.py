@@ -0,0 +1,103 @@
+"""Линейная регрессия с обновлением по мере поступления новых наблюдений.
+Коэффициенты вычисляются из достаточных статистик (X'X и X'y),
+которые обновляются за O(1) на каждое наблюдение без повторного обучения.
+Поправка на систематическое отклонение прогноза (аналог поправки на MAE
+в Price_model_LinearRegression.py) равна среднему отклонению прогнозов
+от фактических значений на предшествующих шагах.
+"""
+
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+
+def _design(x) -> np.ndarray:
+    """Функция добавляет к признакам x столбец единиц (свободный член)."""
+    x = np.asarray(x, dtype='float64')
+    x = x.reshape(len(x), -1) if x.ndim != 2 else x
+    return np.column_stack([np.ones(len(x)), x])
+
+
+class OnlineLinearRegression:
+    """Линейная регрессия y = b0 + b1 * x1 + ... с пошаговым обновлением
+    достаточных статистик и поправкой на среднее отклонение прогноза."""
+
+    def __init__(self, n_features: int = 1):
+        size = n_features + 1
+        self.xtx = np.zeros((size, size))  # сумма x * x' (с учетом свободного члена)
+        self.xty = np.zeros(size)  # сумма x * y
+        self.coef = np.zeros(size)  # коэффициенты [b0, b1, ...]
+        self.error_sum = 0.0  # сумма отклонений прогноза от факта
+        self.n_forecasts = 0  # количество прогнозов, сверенных с фактом
+        self.n_observations = 0  # количество наблюдений в модели
+
+    def fit(self, x, y):
+        """Функция обучает модель на исторических данных x, y
+        (накапливает достаточные статистики одной векторной операцией)."""
+        design = _design(x)
+        self.xtx += design.T @ design
+        self.xty += design.T @ np.asarray(y, dtype='float64')
+        self.n_observations += len(design)
+        self._solve()
+        return self
+
+    def _solve(self):
+        """Функция пересчитывает коэффициенты по достаточным статистикам."""
+        self.coef = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    @property
+    def bias(self) -> float:
+        """Среднее отклонение прогноза от факта на предшествующих шагах."""
+        return self.error_sum / self.n_forecasts if self.n_forecasts else 0.0
+
+    def predict(self, x, corrected=True) -> np.ndarray:
+        """Функция возвращает прогноз для x (с поправкой на среднее отклонение,
+        если corrected=True)."""
+        forecast = _design(x) @ self.coef
+        return forecast - self.bias if corrected else forecast
+
+    def update(self, x, y: float) -> float:
+        """Функция принимает новое наблюдение (x, y): сверяет с фактом прогноз,
+        сделанный до его поступления, обновляет поправку и коэффициенты.
+        Возвращает прогноз без поправки, сделанный до обновления."""
+        row = _design([x])[0]
+        forecast = row @ self.coef
+        self.error_sum += forecast - y
+        self.n_forecasts += 1
+        self.xtx += np.outer(row, row)
+        self.xty += row * y
+        self.n_observations += 1
+        self._solve()
+        return forecast
+
+
+@stage
+def walk_forward(x, y, n_train: int) -> pd.DataFrame:
+    """Функция выполняет пошаговую проверку модели (walk-forward backtest):
+    на каждом шаге t >= n_train модель, обученная на наблюдениях [0, t),
+    прогнозирует y[t]. Все шаги вычисляются векторно через накопленные
+    достаточные статистики, без повторного обучения модели. Коэффициенты
+    вычисляются через псевдообратную матрицу, как в OnlineLinearRegression
+    (вырожденная выборка, например постоянный x, не приводит к ошибке).
+    Возвращает датафрейм со столбцами: прогноз, поправка (среднее отклонение
+    прогнозов на предыдущих шагах), прогноз с поправкой, факт и относительная разница."""
+    design = _design(x)
+    y = np.asarray(y, dtype='float64')
+    if n_train < design.shape[1]:
+        raise ValueError(f'Размер обучающей выборки n_train ({n_train}) должен быть не меньше '
+                         f'количества признаков + 1 ({design.shape[1]})')
+    # Накопленные X'X и X'y: для шага t используются суммы по строкам [0, t)
+    xtx = np.cumsum(design[:, :, None] * design[:, None, :], axis=0)[n_train - 1:-1]
+    xty = np.cumsum(design * y[:, None], axis=0)[n_train - 1:-1]
+    coef = (np.linalg.pinv(xtx) @ xty[:, :, None])[:, :, 0]
+    forecast = np.einsum('ij,ij->i', design[n_train:], coef)
+    actual = y[n_train:]
+    # Поправка на шаге t - среднее отклонение прогнозов на шагах [n_train, t):
+    errors = np.cumsum(forecast - actual)
+    bias = np.concatenate([[0.0], errors[:-1] / np.arange(1, len(errors))])[:len(errors)]
+    corrected = forecast - bias
+    return pd.DataFrame({'forecast': forecast, 'bias': bias, 'corrected': corrected,
+                         'actual': actual, 'difference': corrected / actual - 1})
@@ -0,0 +1,193 @@
+"""Скользящие и периодные матрицы корреляции и ковариации для нескольких рядов.
+Для каждой пары рядов накапливаются суммы: количество совместно заполненных
+наблюдений, суммы значений, квадратов и попарных произведений. Добавление
+нового наблюдения и исключение наблюдения, вышедшего за пределы окна,
+выполняются за O(1) относительно длины окна, все пары рядов обрабатываются
+одновременно векторными операциями numpy. Пропуски (np.nan) исключаются попарно,
+как в pd.DataFrame.corr().
+"""
+
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+
+# Наибольшая длина участка, по которому вычисляются накопленные суммы
+# (при большей длине растет погрешность разности накопленных сумм):
+_SEGMENT = 4096
+
+
+def _reference(values: np.ndarray) -> np.ndarray:
+    """Функция возвращает опорные значения рядов - первые заполненные
+    наблюдения (np.nan для рядов без наблюдений). Суммы вычисляются по
+    отклонениям от опорных значений, что сохраняет точность для рядов
+    с большим уровнем значений (корреляция и ковариация от сдвига не зависят)."""
+    valid = ~np.isnan(values)
+    reference = values[valid.argmax(axis=0), np.arange(values.shape[1])] if len(values) else \
+        np.full(values.shape[1], np.nan)
+    return np.where(valid.any(axis=0), reference, np.nan)
+
+
+def _pair_sums(values: np.ndarray) -> np.ndarray:
+    """Функция вычисляет вклад каждого наблюдения в попарные суммы.
+    Аргументы:
+        values - массив наблюдений размера (m, k).
+    Возвращает:
+        Массив размера (m, 4, k, k): количество совместно заполненных
+        значений, сумма x_i, сумма x_i ** 2 (по строкам, где заполнен ряд j)
+        и сумма x_i * x_j."""
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    v = valid.astype('float64')
+    sums = np.empty((len(values), 4) + (values.shape[1],) * 2)
+    sums[:, 0] = v[:, :, None] * v[:, None, :]
+    sums[:, 1] = x[:, :, None] * v[:, None, :]
+    sums[:, 2] = (x ** 2)[:, :, None] * v[:, None, :]
+    sums[:, 3] = x[:, :, None] * x[:, None, :]
+    return sums
+
+
+def _cumulative_sums(values: np.ndarray) -> np.ndarray:
+    """Функция вычисляет накопленные попарные суммы отклонений наблюдений
+    values (m, k) от опорных значений.
+    Возвращает массив размера (m + 1, 4, k, k) с нулевыми суммами в первой строке."""
+    k = values.shape[1]
+    centered = values - _reference(values)
+    return np.concatenate([np.zeros((1, 4, k, k)), np.cumsum(_pair_sums(centered), axis=0)])
+
+
+def _covariance(sums: np.ndarray) -> np.ndarray:
+    """Функция вычисляет матрицы ковариации из попарных сумм (..., 4, k, k)."""
+    n, sx, _, sxy = np.moveaxis(sums, -3, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (sxy - sx * np.swapaxes(sx, -1, -2) / n) / (n - 1)
+    return np.where(n > 1, cov, np.nan)
+
+
+def _correlation(sums: np.ndarray) -> np.ndarray:
+    """Функция вычисляет матрицы корреляции из попарных сумм (..., 4, k, k)."""
+    n, sx, sxx, sxy = np.moveaxis(sums, -3, 0)
+    sx_t = np.swapaxes(sx, -1, -2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = sxx - sx ** 2 / n
+        corr = (sxy - sx * sx_t / n) / np.sqrt(var * np.swapaxes(var, -1, -2))
+    return np.clip(np.where(n > 1, corr, np.nan), -1.0, 1.0)
+
+
+class RollingCorrelation:
+    """Скользящая (window - количество наблюдений) или накопленная (window=None)
+    матрица корреляции рядов columns с поддержкой добавления новых наблюдений
+    без пересчета истории. Суммы окна обновляются на каждом шаге: добавляется
+    вклад нового наблюдения и вычитается вклад наблюдения, вышедшего за пределы
+    окна (последние window наблюдений хранятся в кольцевом буфере). Суммы
+    вычисляются по отклонениям от опорных значений рядов; после каждых window
+    наблюдений опорные значения обновляются, а суммы окна пересчитываются
+    по буферу, чтобы погрешность вычитания не накапливалась."""
+
+    def __init__(self, columns: list, window=None):
+        self.columns = list(columns)  # названия рядов
+        self.window = window  # длина окна (None - все наблюдения)
+        self.sums = np.zeros((4, len(columns), len(columns)))  # попарные суммы текущего окна
+        self.reference = np.full(len(columns), np.nan)  # опорные значения рядов
+        # Кольцевой буфер последних наблюдений окна (наблюдение с номером i - в строке i % window):
+        self.buffer = np.full((window, len(columns)), np.nan) if window else None
+        self.n_observations = 0  # общее количество добавленных наблюдений
+        self.recentered = 0  # количество наблюдений на момент пересчета сумм окна
+
+    def append(self, values) -> np.ndarray:
+        """Функция добавляет наблюдения values (массив (m, k) или датафрейм
+        со столбцами columns) и возвращает матрицы корреляции
+        после каждого из них (массив (m, k, k))."""
+        if isinstance(values, pd.DataFrame):
+            values = values[self.columns]
+        values = np.atleast_2d(np.asarray(values, dtype='float64'))
+        if self.window is None or len(values) <= _SEGMENT:
+            return self._append(values)
+        step = max(self.window, _SEGMENT)
+        return np.concatenate([self._append(values[i:i + step]) for i in range(0, len(values), step)])
+
+    def _append(self, values: np.ndarray) -> np.ndarray:
+        """Функция добавляет наблюдения values (массив (m, k)) и возвращает
+        матрицы корреляции после каждого из них."""
+        unset = np.isnan(self.reference)
+        if unset.any():
+            self.reference[unset] = _reference(values)[unset]
+        n, m = self.n_observations, len(values)
+        contributions = _pair_sums(values - self.reference)
+        if self.window is not None:
+            # Наблюдения, выходящие из окна после каждого нового наблюдения
+            # (строки np.nan не вносят вклада в суммы):
+            leaving = np.arange(n, n + m) - self.window
+            removed = np.full(values.shape, np.nan)
+            from_buffer = (leaving >= 0) & (leaving < n)
+            removed[from_buffer] = self.buffer[leaving[from_buffer] % self.window]
+            removed[leaving >= n] = values[leaving[leaving >= n] - n]
+            contributions -= _pair_sums(removed - self.reference)
+            kept = np.arange(max(n, n + m - self.window), n + m)
+            self.buffer[kept % self.window] = values[kept - n]
+        window_sums = self.sums + np.cumsum(contributions, axis=0)
+        if m:
+            self.sums = window_sums[-1]
+        self.n_observations += m
+        if self.window is not None and self.n_observations - self.recentered >= self.window:
+            self._recenter()
+        return _correlation(window_sums)
+
+    def _recenter(self):
+        """Функция пересчитывает суммы окна по кольцевому буферу относительно
+        новых опорных значений (первых заполненных наблюдений буфера)."""
+        self.reference = _reference(self.buffer)
+        self.sums = _pair_sums(self.buffer - self.reference).sum(axis=0)
+        self.recentered = self.n_observations
+
+    def update(self, observation) -> pd.DataFrame:
+        """Функция добавляет одно наблюдение и возвращает текущую матрицу корреляции."""
+        self.append(np.asarray(observation, dtype='float64').reshape(1, -1))
+        return self.correlation()
+
+    def correlation(self) -> pd.DataFrame:
+        """Функция возвращает матрицу корреляции по текущему окну."""
+        return pd.DataFrame(_correlation(self.sums), index=self.columns, columns=self.columns)
+
+    def covariance(self) -> pd.DataFrame:
+        """Функция возвращает матрицу ковариации по текущему окну."""
+        return pd.DataFrame(_covariance(self.sums), index=self.columns, columns=self.columns)
+
+
+@stage
+def rolling_correlation(df: pd.DataFrame, columns: list, window: int) -> np.ndarray:
+    """Функция вычисляет матрицы корреляции рядов columns датафрейма df
+    по скользящему окну из window наблюдений для каждой строки.
+    Суммы окон получаются как разности накопленных сумм, которые вычисляются
+    по участкам длиной не более max(window, 4096) наблюдений (с предшествующими
+    window - 1 наблюдениями) относительно опорных значений каждого участка.
+    Возвращает массив размера (len(df), k, k)."""
+    values = df[columns].to_numpy(dtype='float64')
+    matrices = np.empty((len(values), len(columns), len(columns)))
+    step = max(window, _SEGMENT)
+    for start in range(0, len(values), step):
+        first = max(start - window + 1, 0)
+        cumulative = _cumulative_sums(values[first:start + step])
+        ends = np.arange(start, min(start + step, len(values))) + 1 - first
+        matrices[start:start + step] = _correlation(cumulative[ends] - cumulative[np.maximum(ends - window, 0)])
+    return matrices
+
+
+@stage
+def regime_correlation(df: pd.DataFrame, columns: list, breakpoints: list, covariance=False) -> list:
+    """Функция вычисляет матрицы корреляции (или ковариации, если covariance=True)
+    рядов columns для периодов, разделенных датами breakpoints.
+    Датафрейм df должен быть отсортирован по столбцу 'Date'.
+    Суммы по всем периодам получаются из одного прохода накопленных сумм.
+    Возвращает список из len(breakpoints) + 1 датафреймов (по периодам в порядке дат)."""
+    values = df[columns].to_numpy(dtype='float64')
+    cumulative = _cumulative_sums(values)
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    bounds = np.searchsorted(dates, pd.to_datetime(breakpoints).to_numpy(dtype='datetime64[ns]'))
+    bounds = np.concatenate([[0], bounds, [len(values)]])
+    period_sums = cumulative[bounds[1:]] - cumulative[bounds[:-1]]
+    matrices = _covariance(period_sums) if covariance else _correlation(period_sums)
+    return [pd.DataFrame(matrix, index=columns, columns=columns) for matrix in matrices]
@@ -0,0 +1,11 @@
+"""Подключение общих модулей репозитория (stage_trace.py, dataset_cache.py
+в корневом каталоге): при импорте корневой каталог добавляется в sys.path.
+Модули проекта, использующие общие модули, импортируют этот модуль перед ними.
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
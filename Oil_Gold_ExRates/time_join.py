@@ -0,0 +1,80 @@
+"""Объединение нескольких временных рядов по дате за один проход.
+Ряды должны быть отсортированы по возрастанию даты (как в колоночном кэше
+market_data.py). Поддерживаются режимы:
+    'inner' - только даты, присутствующие во всех рядах;
+    'outer' - все даты, пропуски заполняются np.nan;
+    'asof'  - все даты, для каждого ряда берется последнее известное значение
+              не старше tolerance (например, в дни, когда биржа была закрыта).
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+
+def _sorted_dates(df: pd.DataFrame) -> np.ndarray:
+    """Функция возвращает даты ряда в виде массива datetime64[ns]
+    и проверяет, что они строго возрастают."""
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+        raise ValueError('Даты в ряду должны быть уникальными и отсортированы по возрастанию')
+    return dates
+
+
+@stage
+def join_on_date(frames: list, how: str = 'inner', tolerance=None, index=None) -> pd.DataFrame:
+    """Функция объединяет датафреймы frames со столбцом 'Date' в одну таблицу.
+    Аргументы:
+        frames - список датафреймов, отсортированных по дате,
+                 имена столбцов (кроме 'Date') не должны повторяться.
+        how - режим объединения: 'inner', 'outer' или 'asof'.
+        tolerance - максимальный возраст последнего известного значения
+                    для режима 'asof' (pd.Timedelta или строка, например '5D');
+                    None - без ограничения.
+        index - даты итоговой таблицы (по умолчанию пересечение дат
+                для 'inner' и объединение дат для 'outer' и 'asof').
+    Возвращает:
+        Датафрейм со столбцом 'Date' и столбцами всех рядов."""
+    if how not in ('inner', 'outer', 'asof'):
+        raise ValueError(f'Неизвестный режим объединения: {how}')
+    columns = [col for df in frames for col in df.columns if col != 'Date']
+    if len(columns) != len(set(columns)):
+        raise ValueError('Имена столбцов в объединяемых рядах повторяются')
+
+    all_dates = [_sorted_dates(df) for df in frames]
+    if index is not None:
+        target = np.asarray(index, dtype='datetime64[ns]')
+    elif how == 'inner':
+        target = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), all_dates)
+    else:
+        target = reduce(np.union1d, all_dates)
+    if tolerance is not None:
+        tolerance = pd.Timedelta(tolerance).to_timedelta64()
+
+    result = {'Date': target}
+    keep = np.ones(len(target), dtype=bool)  # строки, найденные во всех рядах
+    for df, dates in zip(frames, all_dates):
+        # Позиция последней даты ряда, не превышающей дату итоговой таблицы:
+        pos = np.searchsorted(dates, target, side='right') - 1
+        found = pos >= 0
+        pos[~found] = 0
+        if len(dates) == 0:
+            found[:] = False
+        elif how == 'asof':
+            if tolerance is not None:
+                found &= target - dates[pos] <= tolerance
+        else:
+            found &= dates[pos] == target
+        keep &= found
+        for col in df.columns:
+            if col == 'Date':
+                continue
+            values = df[col].to_numpy(dtype='float64')
+            result[col] = np.where(found, values[pos] if len(values) else np.nan, np.nan)
+    if how == 'inner' and not keep.all():
+        result = {col: values[keep] for col, values in result.items()}
+    return pd.DataFrame(result, copy=False)
@@ -0,0 +1,175 @@
+"""Пакетный подбор параметров кривых падения дебита нефти и роста обводненности
+для многих скважин (ежемесячный пересчет прогнозов).
+
+Для каждой скважины из таблицы (well, date, Qн, Qж, Обв) определяется стартовая
+точка (пик дебита нефти и минимум обводненности), параметры уравнений подбираются
+с помощью curve_fit() в пуле процессов с начальными значениями из предыдущего
+расчета. Результат - таблица параметров и ковариаций и единый массив прогнозов
+с доверительными интервалами на horizon дней вперед для всех скважин.
+"""
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import curve_fit
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+# Параметры уравнений:
+OIL_PARAMS = ['qi', 'b', 'di']
+WATER_PARAMS = ['wpc']
+
+# Столбцы массива прогнозов (третья ось):
+FORECAST_COLUMNS = ['Qн_pred', 'Qн_upper', 'Qн_lower', 'Обв_pred', 'Обв_upper', 'Обв_lower']
+
+
+def hyperbolic_equation(t: float, qi: float, b: float, di: float):
+    """Функция кривой гиперболического падения (Hyperbolic decline curve).
+    Аргументы:
+        t - время с начала работы скважины в днях.
+        qi - максимум дебита в стартовый период работы скважины
+             (или максимум более позднего периода для нетипичных скважин).
+        b - константа гиперболического падения.
+        di - номинальный уровень падения на шаге t=0.
+    Возвращает:
+        Ожидаемый уровень дебита на шаге t."""
+    return qi / ((1.0 + b * di * t) ** (1.0 / b))
+
+
+def exp_equation(t: float, wpc: float):
+    """Функция кривой экспоненциального роста обводненности.
+    Аргументы:
+        t - время с начала работы скважины в днях.
+        wpc - минимум обводненности в стартовый период работы скважины
+             (или минимум более позднего периода для нетипичных скважин).
+    Output:
+        Возвращает ожидаемый уровень обводненности на шаге t."""
+    return (t / (t + wpc)) * 100
+
+
+def _start_sequence(days: np.ndarray, values: np.ndarray, use_max: bool):
+    """Функция находит стартовую точку ряда (максимум или минимум значений)
+    и возвращает день стартовой точки, смещение шкалы дней, значение
+    в стартовой точке и усеченный ряд (t от 1, значения)."""
+    filled = ~np.isnan(values)
+    days, values = days[filled], values[filled]
+    start = np.argmax(values) if use_max else np.argmin(values)
+    offset = days[start] - 1  # дате стартовой точки соответствует t=1
+    return days[start], offset, values[start], days[start:] - offset, values[start:]
+
+
+@stage(name='curve_fit')
+def _fit(equation, t, y, bounds, p0, n_params):
+    """Функция подбирает параметры уравнения; при ошибке подбора
+    возвращает параметры и ковариацию, заполненные np.nan."""
+    if p0 is not None:
+        p0 = np.clip(p0, bounds[0], bounds[1])
+        if np.isnan(p0).any():
+            p0 = None
+    try:
+        return curve_fit(equation, t, y, p0=p0, bounds=bounds)
+    except (RuntimeError, ValueError):
+        return np.full(n_params, np.nan), np.full((n_params, n_params), np.nan)
+
+
+@stage
+def fit_well(task: tuple) -> dict:
+    """Функция подбирает параметры кривых для одной скважины.
+    task - кортеж (скважина, дни, дебит нефти, обводненность,
+    начальные параметры нефти или None, начальные параметры обводненности или None)."""
+    well, days, oil, water_cut, oil_p0, water_p0 = task
+    result = {'well': well, 'last_day': days[-1]}
+
+    if (~np.isnan(oil)).sum() >= len(OIL_PARAMS):
+        peak_day, offset, qi, t, y = _start_sequence(days, oil, use_max=True)
+        popt, pcov = _fit(hyperbolic_equation, t, y, (0, [qi, 2, 20]), oil_p0, len(OIL_PARAMS))
+    else:
+        peak_day, offset = np.nan, np.nan
+        popt, pcov = np.full(3, np.nan), np.full((3, 3), np.nan)
+    result.update({'peak_day': peak_day, 'oil_offset': offset})
+    result.update(_named(OIL_PARAMS, popt, pcov))
+
+    if (~np.isnan(water_cut)).sum() >= len(WATER_PARAMS):
+        min_day, offset, wpc, t, y = _start_sequence(days, water_cut, use_max=False)
+        popt, pcov = _fit(exp_equation, t, y, (wpc, np.inf), water_p0, len(WATER_PARAMS))
+    else:
+        min_day, offset = np.nan, np.nan
+        popt, pcov = np.full(1, np.nan), np.full((1, 1), np.nan)
+    result.update({'min_day': min_day, 'water_offset': offset})
+    result.update(_named(WATER_PARAMS, popt, pcov))
+    return result
+
+
+def _named(names: list, popt: np.ndarray, pcov: np.ndarray) -> dict:
+    """Функция возвращает словарь параметров и элементов ковариационной матрицы
+    (верхний треугольник, ключи вида 'cov_qi_b')."""
+    values = dict(zip(names, popt))
+    for i in range(len(names)):
+        for j in range(i, len(names)):
+            values[f'cov_{names[i]}_{names[j]}'] = pcov[i, j]
+    return values
+
+
+def _tasks(wells: pd.DataFrame, previous):
+    """Функция формирует задачи подбора параметров для каждой скважины.
+    Номер дня работы скважины - порядковый номер строки в пределах скважины."""
+    for well, group in wells.groupby('well', sort=False):
+        days = np.arange(1, len(group) + 1, dtype='float64')
+        oil_p0 = water_p0 = None
+        if previous is not None and well in previous.index:
+            oil_p0 = previous.loc[well, OIL_PARAMS].to_numpy(dtype='float64')
+            water_p0 = previous.loc[well, WATER_PARAMS].to_numpy(dtype='float64')
+        yield (well, days, group['Qн'].to_numpy(dtype='float64'),
+               group['Обв'].to_numpy(dtype='float64'), oil_p0, water_p0)
+
+
+@stage
+def forecast(params: pd.DataFrame, horizon: int = 365) -> np.ndarray:
+    """Функция вычисляет прогнозы на horizon дней после последнего дня
+    наблюдений для всех скважин таблицы params одной векторной операцией.
+    Доверительные интервалы: для дебита нефти - qi +/- стандартное отклонение qi,
+    для обводненности - wpc +/- 2 стандартных отклонения.
+    Возвращает массив размера (скважины, horizon, len(FORECAST_COLUMNS))."""
+    col = {name: params[name].to_numpy(dtype='float64')[:, None] for name in params.columns
+           if name != 'well'}
+    days = col['last_day'] + np.arange(1, horizon + 1)
+    t_oil = days - col['oil_offset']
+    t_water = days - col['water_offset']
+    qi_sigma = np.sqrt(col['cov_qi_qi'])
+    wpc_sigma = np.sqrt(col['cov_wpc_wpc'])
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        return np.stack([
+            hyperbolic_equation(t_oil, col['qi'], col['b'], col['di']),
+            hyperbolic_equation(t_oil, col['qi'] + qi_sigma, col['b'], col['di']),
+            hyperbolic_equation(t_oil, col['qi'] - qi_sigma, col['b'], col['di']),
+            exp_equation(t_water, col['wpc']),
+            exp_equation(t_water, col['wpc'] + 2 * wpc_sigma),
+            exp_equation(t_water, col['wpc'] - 2 * wpc_sigma),
+        ], axis=-1)
+
+
+@stage
+def fit_wells(wells: pd.DataFrame, previous=None, horizon: int = 365, workers=None) -> tuple:
+    """Функция подбирает параметры кривых для всех скважин таблицы wells
+    (столбцы 'well', 'date', 'Qн', 'Обв', по одной строке на скважину и день).
+    Аргументы:
+        previous - таблица параметров предыдущего расчета (результат fit_wells)
+                   для начальных значений подбора или None.
+        horizon - количество дней прогноза.
+        workers - количество процессов (1 - без параллельной обработки).
+    Возвращает:
+        Таблицу параметров и ковариаций (индекс - скважина)
+        и массив прогнозов размера (скважины, horizon, len(FORECAST_COLUMNS))."""
+    wells = wells.sort_values(['well', 'date'], kind='stable')
+    tasks = list(_tasks(wells, previous))
+    if workers == 1 or len(tasks) <= 1:
+        results = list(map(fit_well, tasks))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with context.Pool(workers) as pool:
+            results = pool.map(fit_well, tasks, chunksize=max(1, len(tasks) // (4 * (workers or 4))))
+    params = pd.DataFrame(results)
+    return params.set_index('well'), forecast(params, horizon)
@@ -0,0 +1,109 @@
+"""Загрузка ежемесячных отчетов по скважинам (формат файла 'well_data.xlsx').
+
+Структура листа: заголовки в строке с индексом 3; столбец 'Дата' содержит
+объединенные ячейки с месяцем и годом ('Январь 2015'), столбец 'Параметр' -
+наименование показателя, столбцы 1-31 - ежедневные значения (дробная часть
+может отделяться запятой), столбец 'Средн.' - среднемесячное значение.
+
+Даты вычисляются арифметически (начало месяца + номер дня) без формирования
+и разбора строк, числа с запятой преобразуются одной векторной операцией.
+Результат - таблица (well, date, Qн, Qж, Обв) с одной строкой на скважину и день.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+# Номера месяцев по названиям:
+MONTHS = {'Январь': 1, 'Февраль': 2, 'Март': 3, 'Апрель': 4, 'Май': 5, 'Июнь': 6,
+          'Июль': 7, 'Август': 8, 'Сентябрь': 9, 'Октябрь': 10, 'Ноябрь': 11, 'Декабрь': 12}
+
+# Параметры, загружаемые из отчета: дебит нефти, дебит жидкости, обводненность.
+PARAMETERS = ['Qн', 'Qж', 'Обв']
+
+
+def parse_months(labels: pd.Series) -> np.ndarray:
+    """Функция преобразует строки формата 'Месяц гггг' в массив datetime64[M].
+    Каждое уникальное значение разбирается один раз, нераспознанные - NaT."""
+    codes, uniques = pd.factorize(labels)
+    months = np.full(len(uniques) + 1, np.datetime64('NaT'), dtype='datetime64[M]')
+    for i, label in enumerate(uniques):
+        parts = str(label).split()
+        if len(parts) == 2 and parts[0] in MONTHS and parts[1].isdigit():
+            months[i] = np.datetime64(f'{int(parts[1]):04d}-{MONTHS[parts[0]]:02d}', 'M')
+    return months[codes]  # код -1 (пропуск) указывает на последний элемент (NaT)
+
+
+def to_numbers(values: pd.DataFrame) -> np.ndarray:
+    """Функция преобразует значения в числа float64: в текстовых столбцах
+    запятая заменяется точкой, нечисловые значения заменяются np.nan."""
+    columns = []
+    for col in values.columns:
+        column = values[col]
+        if not pd.api.types.is_numeric_dtype(column):
+            column = pd.to_numeric(column.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+        columns.append(column.to_numpy(dtype='float64', na_value=np.nan))
+    return np.column_stack(columns) if columns else np.empty((len(values), 0))
+
+
+@stage
+def parse_well_report(report: pd.DataFrame, well=None) -> pd.DataFrame:
+    """Функция преобразует лист отчета (считанный с header=3) в таблицу
+    с ежедневными значениями параметров скважины well.
+    Возвращает датафрейм со столбцами 'well', 'date', 'Qн', 'Qж', 'Обв',
+    отсортированный по дате (несуществующие дни месяца исключаются,
+    повторяющиеся значения за один день усредняются)."""
+    # Заполняем пропуски в объединенных ячейках с месяцем и годом:
+    month_labels = report['Дата'].ffill()
+    # Номера параметров в PARAMETERS (-1 - прочие показатели отчета):
+    parameters = pd.Index(PARAMETERS).get_indexer(report['Параметр'])
+    rows = np.flatnonzero(parameters >= 0)
+    day_columns = [col for col in report.columns if str(col).isdigit() and 1 <= int(col) <= 31]
+    days = np.array([int(col) for col in day_columns])
+
+    months = parse_months(month_labels.iloc[rows])
+    values = to_numbers(report.iloc[rows][day_columns])  # (строки, дни)
+    # Дата = начало месяца + (номер дня - 1); дни за пределами месяца отбрасываются:
+    dates = months.astype('datetime64[D]')[:, None] + (days - 1).astype('timedelta64[D]')
+    month_end = (months + 1).astype('datetime64[D]')[:, None]
+    valid = ~np.isnat(dates) & (dates < month_end)
+
+    dates = dates[valid]
+    params = np.broadcast_to(parameters[rows][:, None], valid.shape)[valid]
+    values = values[valid]
+    # Таблица "дата x параметр" через суммы и количество заполненных значений:
+    unique_dates, date_codes = np.unique(dates, return_inverse=True)
+    filled = ~np.isnan(values)
+    sums = np.zeros((len(unique_dates), len(PARAMETERS)))
+    counts = np.zeros_like(sums)
+    np.add.at(sums, (date_codes[filled], params[filled]), values[filled])
+    np.add.at(counts, (date_codes[filled], params[filled]), 1)
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+
+    result = pd.DataFrame(means, columns=PARAMETERS)
+    result.insert(0, 'date', unique_dates.astype('datetime64[ns]'))
+    result.insert(0, 'well', well)
+    return result
+
+
+@stage
+def load_well_report(path: str, well=None) -> pd.DataFrame:
+    """Функция считывает отчет по скважине из xlsx-файла path.
+    Если well не указан, идентификатором скважины служит имя файла."""
+    if well is None:
+        well = os.path.splitext(os.path.basename(path))[0]
+    return parse_well_report(pd.read_excel(path, header=3), well)
+
+
+@stage
+def load_well_reports(paths) -> pd.DataFrame:
+    """Функция считывает отчеты по нескольким скважинам: paths - список путей
+    к файлам или словарь {идентификатор скважины: путь}.
+    Возвращает общую таблицу (well, date, Qн, Qж, Обв)."""
+    items = paths.items() if isinstance(paths, dict) else ((None, path) for path in paths)
+    return pd.concat([load_well_report(path, well) for well, path in items], ignore_index=True)
@@ -0,0 +1,171 @@
+"""Пакетный расчет рекомендаций для многих пользователей (например, ночной пересчет).
+Сходство пользователей вычисляется блоками как произведение разреженных матриц
+"пользователь x песня" из индекса SongIndex:
+    'overlap' - количество прослушиваний песен текущего пользователя (как в
+                Recommender.create_user(): учитываются пользователи, прослушавшие
+                не менее min_share репертуара текущего пользователя);
+    'cosine'  - косинусное сходство наборов прослушанных песен.
+Песни различаются по song_id. Для каждого пользователя блока выбираются k наиболее
+похожих (np.partition по строкам матрицы сходства), оценки песен для всего блока
+вычисляются одним произведением матрицы сходства с k похожими пользователями
+на матрицу прослушанных песен: оценка - сумма сходства похожих пользователей,
+которые слушали песню. Результат детерминирован и не зависит от числа процессов.
+"""
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender import SongIndex
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+# Наибольшее количество элементов плотного массива при выборе k наибольших значений:
+_DENSE_LIMIT = 1 << 22
+
+# Индекс и матрицы рабочего процесса (при запуске через fork
+# наследуются от родительского процесса без копирования):
+_index = None
+_matrices = None
+
+
+def _prepare(index: SongIndex, metric: str) -> tuple:
+    """Функция готовит матрицы для вычисления сходства: бинарную матрицу
+    прослушанных песен, левую и правую матрицы произведения."""
+    listened = (index.user_songs > 0).astype(np.float32).tocsr()
+    if metric == 'overlap':
+        return listened, listened, index.user_songs.astype(np.float32).T.tocsr()
+    if metric == 'cosine':
+        norms = np.sqrt(np.asarray(listened.sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        normalized = sparse.diags(1.0 / norms).dot(listened).tocsr()
+        return listened, normalized, normalized.T.tocsr()
+    raise ValueError(f'Неизвестная мера сходства: {metric}')
+
+
+def _top_k(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, n_rows: int, k: int) -> tuple:
+    """Функция выбирает в каждой строке разреженной матрицы (значения values
+    в позициях (rows, cols), строки rows упорядочены по возрастанию) k наибольших
+    значений. k-е по величине значение строки находится np.partition по строкам,
+    дополненным до одинаковой длины значением -inf (группами соседних строк
+    не более _DENSE_LIMIT элементов). Возвращает номера строк, столбцов и значения,
+    упорядоченные по строке и по убыванию значения (при равенстве значений -
+    по возрастанию столбца)."""
+    if k <= 0 or not len(values):
+        return rows[:0], cols[:0], values[:0]
+    lengths = np.bincount(rows, minlength=n_rows)
+    if lengths.max() > k:
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        positions = np.arange(len(values)) - bounds[rows]  # позиция значения в строке
+        threshold = np.full(n_rows, -np.inf, dtype=values.dtype)
+        step = max(1, _DENSE_LIMIT // lengths.max())
+        for first in range(0, n_rows, step):
+            last = min(first + step, n_rows)
+            width = lengths[first:last].max()
+            if width <= k:
+                continue
+            part = slice(bounds[first], bounds[last])
+            padded = np.full((last - first, width), -np.inf, dtype=values.dtype)
+            padded[rows[part] - first, positions[part]] = values[part]
+            threshold[first:last] = -np.partition(-padded, k - 1, axis=1)[:, k - 1]
+        # Значения, равные k-му, сохраняются все и затем упорядочиваются по столбцу:
+        keep = values >= threshold[rows]
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    return rows[rank < k], cols[rank < k], values[rank < k]
+
+
+def _entries(matrix) -> tuple:
+    """Функция возвращает номера строк, столбцов и значения элементов csr-матрицы."""
+    return np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr)), matrix.indices, matrix.data
+
+
+def _recommend_block(task: tuple) -> tuple:
+    """Функция вычисляет похожих пользователей и рекомендации для блока
+    пользователей codes. Возвращает массивы (пользователь, похожий пользователь,
+    сходство) и (пользователь, песня, оценка)."""
+    codes, metric, k, n, min_share = task
+    listened, left, right = _matrices
+    # Сходство пользователей блока со всеми пользователями (разреженное произведение):
+    rows, users, scores = _entries((left[codes] @ right).tocsr())
+    keep = users != codes[rows]
+    if metric == 'overlap':
+        n_songs = np.diff(listened.indptr)[codes]
+        keep &= scores >= np.floor(n_songs * min_share)[rows]
+    rows, users, scores = _top_k(rows[keep], users[keep], scores[keep], len(codes), k)
+    similar = np.column_stack([codes[rows], users, scores])
+    # Оценка песни - сумма сходства похожих пользователей, которые ее слушали,
+    # для всего блока одним произведением; прослушанные пользователем песни исключаются:
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(codes)))])
+    neighbours = sparse.csr_matrix((scores, users, indptr), shape=(len(codes), listened.shape[0]))
+    neighbours.sort_indices()  # порядок суммирования не зависит от порядка похожих пользователей
+    song_scores = (neighbours @ listened).tocsr()
+    song_scores = (song_scores - song_scores.multiply(listened[codes])).tocsr()
+    song_scores.eliminate_zeros()
+    rows, songs, values = _top_k(*_entries(song_scores), len(codes), n)
+    return similar, np.column_stack([codes[rows], songs, values])
+
+
+def _init_worker(index: SongIndex, metric: str):
+    """Инициализация рабочего процесса: при запуске через spawn
+    индекс передается в процесс, матрицы строятся заново."""
+    global _index, _matrices
+    if _index is not index:
+        _index = index
+        _matrices = _prepare(index, metric)
+
+
+@stage
+def recommend_batch(index: SongIndex, user_ids=None, k: int = 20, n: int = 10, metric: str = 'overlap',
+                    min_share: float = 0.2, block_size: int = 512, workers=None) -> tuple:
+    """Функция рассчитывает рекомендации для пользователей user_ids
+    (по умолчанию - для всех пользователей индекса).
+    Аргументы:
+        index - индекс базы прослушиваний SongIndex.
+        k - количество похожих пользователей.
+        n - количество рекомендуемых песен.
+        metric - мера сходства: 'overlap' или 'cosine'.
+        min_share - минимальная доля совпадений для меры 'overlap'.
+        block_size - количество пользователей в одном блоке.
+        workers - количество процессов (1 - без параллельной обработки).
+    Возвращает:
+        Датафрейм рекомендаций ('user_id', 'rank', 'song_id', 'artist_name', 'title', 'score')
+        и датафрейм похожих пользователей ('user_id', 'rank', 'similar_user_id', 'score')."""
+    global _index, _matrices
+    codes = (np.arange(len(index.users)) if user_ids is None
+             else index.user_lookup.get_indexer(user_ids))
+    if (codes < 0).any():
+        raise KeyError('Неизвестные ID пользователей: '
+                       f'{list(np.asarray(user_ids)[codes < 0][:5])}')
+    _index, _matrices = index, _prepare(index, metric)
+    tasks = [(codes[i:i + block_size], metric, k, n, min_share) for i in range(0, len(codes), block_size)]
+    if workers == 1 or len(tasks) <= 1:
+        results = list(map(_recommend_block, tasks))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with context.Pool(workers, initializer=_init_worker, initargs=(index, metric)) as pool:
+            results = pool.map(_recommend_block, tasks)
+
+    similar = np.concatenate([block[0] for block in results] or [np.empty((0, 3))])
+    recommended = np.concatenate([block[1] for block in results] or [np.empty((0, 3))])
+    similar_df = pd.DataFrame({'user_id': index.users[similar[:, 0].astype(int)],
+                               'similar_user_id': index.users[similar[:, 1].astype(int)],
+                               'score': similar[:, 2]})
+    songs = recommended[:, 1].astype(int)
+    artists, titles = index.song_artists[songs], index.song_titles[songs]
+    artists = np.where(artists >= 0, index.artists.take(np.maximum(artists, 0)), None)
+    titles = np.where(titles >= 0, index.titles.take(np.maximum(titles, 0)), None)
+    recommendations = pd.DataFrame({'user_id': index.users[recommended[:, 0].astype(int)],
+                                    'song_id': index.song_ids[songs],
+                                    'artist_name': artists,
+                                    'title': titles,
+                                    'score': recommended[:, 2]})
+    # Порядковый номер в пределах пользователя (строки уже отсортированы по убыванию оценки):
+    for df in (recommendations, similar_df):
+        df.insert(1, 'rank', df.groupby('user_id', sort=False).cumcount() + 1)
+    return recommendations, similar_df
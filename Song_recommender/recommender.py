@@ -0,0 +1,255 @@
+"""Рекомендации песен на основе общего рейтинга популярности
+и истории прослушиваний пользователя.
+
+Для работы с полной базой Million Song Dataset данные один раз индексируются
+в классе SongIndex: ID пользователей, ID и названия песен, исполнители и релизы
+кодируются целыми числами, прослушивания хранятся в разреженных матрицах
+(CSR/CSC), строки базы упорядочиваются по пользователю, релизу и году выпуска.
+Методы класса Recommender выполняют поиск по индексам вместо фильтрации
+всей базы.
+"""
+
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from stage_trace import stage
+
+
+def _group_order(codes: np.ndarray, n_groups: int):
+    """Функция упорядочивает строки по коду группы.
+    Возвращает порядок строк и границы групп: строки группы g
+    находятся в order[offsets[g]:offsets[g + 1]]. Строки с кодом -1 исключаются."""
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.argsort(codes[valid], kind='stable')]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[valid], minlength=n_groups))])
+    return order, offsets
+
+
+def _sample_groups(rng, order: np.ndarray, offsets: np.ndarray, groups: np.ndarray, n: int) -> np.ndarray:
+    """Функция выбирает случайным образом (с повторениями) n строк из объединения
+    групп groups без формирования полного списка строк. Каждая строка
+    объединения выбирается с равной вероятностью (генератор rng).
+    Возвращает номера строк."""
+    sizes = offsets[groups + 1] - offsets[groups]
+    bounds = np.cumsum(sizes)
+    total = bounds[-1] if len(bounds) else 0
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    picks = rng.integers(0, total, n)
+    which = np.searchsorted(bounds, picks, side='right')
+    return order[offsets[groups[which]] + picks - (bounds[which] - sizes[which])]
+
+
+class SongIndex:
+    """Индексы базы прослушиваний для быстрого поиска рекомендаций.
+    Аргументы:
+        song_df - база прослушиваний ('user_id', 'song_id', 'listenings')
+                  с данными о песнях ('title', 'release', 'artist_name', 'year').
+        popular_df - база песен ('artist_name', 'title', 'listenings'),
+                     отсортированная по общему числу прослушиваний."""
+
+    @stage(name='SongIndex')
+    def __init__(self, song_df: pd.DataFrame, popular_df: pd.DataFrame):
+        self.song_df = song_df
+        self.popular_df = popular_df
+
+        # Целочисленные коды (пропуски кодируются значением -1):
+        self.user_codes, self.users = pd.factorize(song_df['user_id'])
+        self.song_codes, self.song_ids = pd.factorize(song_df['song_id'])
+        self.title_codes, self.titles = pd.factorize(song_df['title'])
+        self.artist_codes, self.artists = pd.factorize(song_df['artist_name'])
+        self.release_codes, self.releases = pd.factorize(song_df['release'])
+        self.user_lookup = pd.Index(self.users)  # ID пользователя -> код
+
+        # Матрица "пользователь x песня (song_id)" с количеством строк базы (CSR)
+        # и ее копия по столбцам (CSC) для подсчета совпадений по песням
+        # (разные песни с одинаковым названием, например 'Intro', различаются):
+        songs = self.song_codes >= 0
+        self.user_songs = sparse.csr_matrix(
+            (np.ones(songs.sum(), dtype=np.int32), (self.user_codes[songs], self.song_codes[songs])),
+            shape=(len(self.users), len(self.song_ids)))
+        self.song_users = self.user_songs.tocsc()
+
+        # Название и исполнитель каждой песни (по первой строке базы с этим song_id):
+        self.song_titles = np.full(len(self.song_ids), -1)
+        self.song_titles[self.song_codes[songs][::-1]] = self.title_codes[songs][::-1]
+        self.song_artists = np.full(len(self.song_ids), -1)
+        self.song_artists[self.song_codes[songs][::-1]] = self.artist_codes[songs][::-1]
+
+        # Матрица "пользователь x название песни" для поиска релизов:
+        valid = self.title_codes >= 0
+        self.user_titles = sparse.csr_matrix(
+            (np.ones(valid.sum(), dtype=np.int32), (self.user_codes[valid], self.title_codes[valid])),
+            shape=(len(self.users), len(self.titles)))
+
+        # Релизы, в которые входит каждая песня (CSR "песня x релиз"):
+        valid &= self.release_codes >= 0
+        self.title_releases = sparse.csr_matrix(
+            (np.ones(valid.sum(), dtype=bool), (self.title_codes[valid], self.release_codes[valid])),
+            shape=(len(self.titles), len(self.releases)))
+
+        # Строки базы, упорядоченные по пользователю и по релизу:
+        self.user_rows, self.user_offsets = _group_order(self.user_codes, len(self.users))
+        self.release_rows, self.release_offsets = _group_order(self.release_codes, len(self.releases))
+
+        # Строки базы с известным годом выпуска, упорядоченные по году:
+        years = song_df['year'].to_numpy(dtype='float64')
+        known = np.flatnonzero(~np.isnan(years))
+        self.year_rows = known[np.argsort(years[known], kind='stable')]
+        self.sorted_years = years[self.year_rows]
+
+        # Строки рейтинга популярности, сгруппированные по исполнителю:
+        popular_artists = self.artists.get_indexer(popular_df['artist_name'])
+        self.artist_rows, self.artist_offsets = _group_order(popular_artists, len(self.artists))
+
+    def user_code(self, user_id) -> int:
+        """Функция возвращает целочисленный код пользователя user_id."""
+        return self.user_lookup.get_loc(user_id)
+
+    def rows_of_user(self, code: int) -> np.ndarray:
+        """Функция возвращает номера строк базы с прослушиваниями пользователя."""
+        return self.user_rows[self.user_offsets[code]:self.user_offsets[code + 1]]
+
+    def song_matches(self, song_codes: np.ndarray) -> np.ndarray:
+        """Функция возвращает для каждого пользователя количество строк базы
+        с песнями из списка song_codes."""
+        return np.asarray(self.song_users[:, song_codes].sum(axis=1)).ravel()
+
+    def year_range(self, start: float, finish: float) -> tuple:
+        """Функция возвращает границы отрезка self.year_rows с песнями,
+        вышедшими в интервале [start, finish]."""
+        return (np.searchsorted(self.sorted_years, start, side='left'),
+                np.searchsorted(self.sorted_years, finish, side='right'))
+
+
+class Recommender():
+    """Класс позволяет формировать списки рекомендуемых пользователям песен
+    на основе общего рейтинга популярности и предшествующей истории прослушиваний пользователя.
+    После создания экземпляра класса необходимо вызвать функцию create_user(),
+    передав ей ID текущего пользователя: это обновит атрибуты класса.
+    Функцию можно вызывать многократно.
+    Список рекомендуемых песен для текущего пользователя формируется
+    через вызов одной из пяти функция: by_popularity(), by_singers(),
+    by_release(), by_similar_users() и by_period().
+    Для пакетного расчета рекомендаций по многим пользователям см. batch_recommender.py."""
+
+    def __init__(self, index: SongIndex, seed=None):
+        """Инициализация экземпляра класса требует передачи индекса базы
+        прослушиваний SongIndex, построенного по датафреймам 'song_df' и 'popular_df'.
+        Параметр seed задает начальное состояние генератора случайных чисел
+        для воспроизводимости рекомендаций.
+        Атрибуты класса задаются при вызове функции create_user()
+        и относятся к текущему пользователю."""
+        self.index = index  # индексы базы прослушиваний
+        self.rng = np.random.default_rng(seed)  # генератор случайных чисел
+        self.user = None  # ID текущего пользователя
+        self.user_code = None  # целочисленный код текущего пользователя
+        self.user_data = None  # база прослушиваний пользователя
+        self.singers = None  # исполнители, прослушанные пользователем
+        self.songs = None  # песни, прослушанные пользователем
+        self.time_start = None  # нижняя граница временного интервала прослушанных песен
+        self.time_finish = None  # верхняя граница временного интервала прослушанных песен
+        self.similar_users = None  # список пользователей с похожей историей прослушиваний
+        self.similar_codes = None  # коды пользователей с похожей историей прослушиваний
+
+    @stage
+    def create_user(self, user_id):
+        """Функция принимает ID пользователя и задает соответствующие ему атрибуты класса.
+        Выводит на экран основные сведения о текущем пользователе: ID, прослушанные песни,
+        исполнители, временной интервал, список похожих пользователей."""
+        index = self.index
+        self.user = user_id
+        self.user_code = index.user_code(user_id)
+        # Строки базы с прослушиваниями текущего пользователя:
+        self.user_data = index.song_df.iloc[index.rows_of_user(self.user_code)].sort_values(by='listenings')
+
+        # Составляем список исполнителей, которых прослушал пользователь:
+        self.singers = self.user_data['artist_name'].unique()
+        # Составляем список песен, которые прослушал пользователь:
+        self.songs = self.user_data['title'].unique()
+
+        # Самый ранний год выпуска среди песен, прослушанных пользователем:
+        self.time_start = self.user_data['year'].min()
+        # Самый поздний год выпуска среди песен, прослушанных пользователем:
+        self.time_finish = self.user_data['year'].max()
+
+        # Количество совпадений с песнями (song_id) текущего пользователя для всех пользователей:
+        user_songs = index.user_songs[self.user_code].indices
+        matches = index.song_matches(user_songs)
+        matches[self.user_code] = 0  # Убираем текущего пользователя
+        # Оставляем только пользователей, которые слушали не менее 20% репертуара текущего пользователя:
+        similarity_check = len(user_songs) // 5
+        self.similar_codes = np.flatnonzero((matches >= similarity_check) & (matches > 0))
+        self.similar_users = pd.Series(index.users[self.similar_codes], name='user_id')
+
+        # Выводим на экран основные сведения о текущем пользователе:
+        print(f'Текущий пользователь: {self.user}')
+        print(f'\nПрослушанные исполнители ({len(self.singers)}):\n{self.singers}')
+        print(f'\nПрослушанные песни ({len(self.songs)} ед.):\n{self.songs}')
+        print(f'\nВременной интервал: с {self.time_start} по {self.time_finish}')
+        print(f'\nПохожие пользователи ({len(self.similar_users)} чел.):\n{self.similar_users}')
+
+    def _print_rows(self, rows: np.ndarray):
+        """Функция выводит на экран исполнителей и названия песен из строк rows базы."""
+        print(self.index.song_df.iloc[rows][['artist_name', 'title']])
+
+    @stage
+    def by_popularity(self, top_limit):
+        """Функция принимает аргумент 'top_limit', определяющий диапазон рейтинга
+        наиболее популярных песен, среди которых будут выбраны рекомендуемые.
+        Функция выводит на экран список из 10 случайно подобранных песен,
+        входящих в рейтинг наиболее популярных по числу прослушиваний."""
+        popular_df = self.index.popular_df
+        # Проверка введенного аргумента на соответствие длине датафрейма:
+        top_limit = min(top_limit, len(popular_df))
+        indexes = self.rng.integers(0, top_limit, 10)  # 10 случайных чисел от 0 до 'top_limit'
+        print(popular_df.iloc[indexes][['artist_name', 'title']])
+
+    @stage
+    def by_singers(self):
+        """Функция выводит на экран список из 10 песен, рекомендуемых пользователю
+        на основе истории его прослушиваний. Песни выбираются из репертуара исполнителей,
+        входящих в список 'self.singers' случайным образом и могут повторяться."""
+        index = self.index
+        artists = index.artists.get_indexer(self.singers)
+        rows = _sample_groups(self.rng, index.artist_rows, index.artist_offsets, artists[artists >= 0], 10)
+        print(index.popular_df.iloc[rows][['artist_name', 'title']])
+
+    @stage
+    def by_release(self):
+        """Функция выводит на экран список из 10 песен, рекомендуемых пользователю
+        на основе истории его прослушиваний. Выбираются композиции из релизов,
+        песни из которых пользователь уже слушал. Список формируется случайным образом.
+        Композиции могут повторяться, особенно если у пользователя ограниченная история прослушиваний."""
+        index = self.index
+        # Релизы, в которые входят песни, прослушанные пользователем:
+        titles = index.user_titles[self.user_code].indices
+        releases = np.unique(index.title_releases[titles].indices)
+        self._print_rows(_sample_groups(self.rng, index.release_rows, index.release_offsets, releases, 10))
+
+    @stage
+    def by_similar_users(self):
+        """Функция выводит на экран список из 10 песен, рекомендуемых пользователю
+        на основе истории его прослушиваний. Песни выбираются из числа востребованных
+        пользователями из списка self.similar_users. Список песен формируется случайным образом."""
+        # Если атрибут 'self.similar_users' содержит значения:
+        if len(self.similar_codes) > 0:
+            index = self.index
+            self._print_rows(_sample_groups(self.rng, index.user_rows, index.user_offsets, self.similar_codes, 10))
+        else:
+            print('Функция не может быть применена: нет пользователей со схожими предпочтениями.')
+
+    @stage
+    def by_period(self):
+        """Функция выводит на экран список из 10 песен, рекомендуемых пользователю
+        на основе истории его прослушиваний. Случайным образом выбираются песни,
+        вышедшие в интервале между self.time_start и self.time_finish."""
+        start, finish = self.index.year_range(self.time_start, self.time_finish)
+        if finish > start:
+            indexes = self.rng.integers(start, finish, 10)
+            self._print_rows(self.index.year_rows[indexes])
+        else:
+            print('Функция не может быть применена: год выпуска прослушанных песен неизвестен.')
@@ -0,0 +1,32 @@
+"""Загрузка исходных данных Million Song Dataset через локальный кэш
+(скачивание, проверка хэша и колоночный кэш - см. dataset_cache.py).
+"""
+
+import os
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from dataset_cache import DatasetCache
+from stage_trace import stage
+
+# Каталог с кэшем (исходные файлы - raw/<sha256>, колоночный кэш - columns/<sha256>/):
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Описание источников: адрес, ожидаемый хэш sha256 (None - не задан,
+# при загрузке выводится предупреждение с хэшем файла), функция чтения и ее параметры:
+SOURCES = {
+    'listenings': {'url': 'https://static.turi.com/datasets/millionsong/10000.txt', 'sha256': None,
+                   'reader': 'table', 'options': {'header': None, 'names': ['user_id', 'song_id', 'listenings']}},
+    'songs': {'url': 'https://static.turi.com/datasets/millionsong/song_data.csv', 'sha256': None,
+              'reader': 'csv', 'options': {}},
+}
+
+_cache = DatasetCache(SOURCES, CACHE_DIR)
+
+
+@stage
+def load_dataset(name: str, mmap: bool = False):
+    """Функция возвращает данные источника name ('listenings', 'songs') в виде
+    датафрейма. Если mmap=True, числовые столбцы отображаются в память из кэша
+    и датафрейм доступен только для чтения."""
+    return _cache.load(name, mmap)
@@ -0,0 +1,144 @@
+"""Куб агрегатов для анализа числа самоубийств в разрезе страны, года, пола,
+возрастной группы и поколения.
+
+Значения измерений один раз кодируются целыми числами (pd.factorize), суммы
+показателей по всем измерениям вычисляются за один проход по исходной таблице.
+Агрегаты для любого набора измерений (grouping sets, rollup) получаются
+сворачиванием наименьшего из уже вычисленных агрегатов, содержащих нужные
+измерения, и кэшируются. Относительные показатели (на 100 тыс. жителей,
+на душу населения) вычисляются по кэшированным суммам. Неаддитивные показатели
+групп (ВВП на душу населения, HDI) не суммируются и выводятся только
+на уровне своей группы.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def rollup(dimensions: list) -> list:
+    """Функция возвращает наборы измерений для иерархической свертки:
+    rollup(['country', 'year']) -> [(), ('country',), ('country', 'year')]."""
+    return [tuple(dimensions[:i]) for i in range(len(dimensions) + 1)]
+
+
+class RateCube:
+    """Куб сумм показателей по комбинациям измерений.
+    Аргументы:
+        df - исходная таблица.
+        dimensions - столбцы-измерения.
+        measures - суммируемые показатели.
+        grain_measures - показатели, повторяющиеся в строках одной группы
+                         (например, ВВП страны за год в строках всех возрастных групп),
+                         в виде словаря {показатель: столбцы группы}; учитываются
+                         один раз на группу. Такие показатели выводятся только
+                         для наборов измерений, совпадающих со столбцами группы.
+        additive - аддитивные показатели из grain_measures (например, ВВП за год),
+                   которые суммируются и для наборов измерений, входящих
+                   в столбцы группы (например, ВВП всех стран за год).
+        sets - наборы измерений, агрегаты для которых вычисляются сразу."""
+
+    def __init__(self, df: pd.DataFrame, dimensions: list, measures=('suicides_no', 'population'),
+                 grain_measures=None, additive=(), sets=None):
+        grain_measures = grain_measures or {}
+        unknown = set(additive) - set(grain_measures)
+        if unknown:
+            raise KeyError(f'Аддитивные показатели отсутствуют в grain_measures: {sorted(unknown)}')
+        self.dimensions = list(dimensions)
+        self.measures = list(measures) + list(grain_measures)
+        # Столбцы группы для показателей, учитываемых один раз на группу:
+        self.grains = {measure: set(grain) for measure, grain in grain_measures.items()}
+        self.additive = set(additive)  # показатели групп, допускающие суммирование
+
+        # Коды значений измерений (значения упорядочены, как в groupby):
+        self.levels = {}
+        codes = []
+        for dim in self.dimensions:
+            dim_codes, self.levels[dim] = pd.factorize(df[dim], sort=True)
+            codes.append(dim_codes)
+        codes = np.column_stack(codes)
+
+        self.dtypes = df[self.measures].dtypes
+        values = np.column_stack([df[m].to_numpy(dtype='float64', na_value=np.nan) for m in self.measures])
+        for i, (measure, grain) in enumerate(grain_measures.items(), start=len(measures)):
+            values[df.duplicated(subset=grain).to_numpy(), i] = np.nan
+        # Строки с пропусками в измерениях не учитываются (как в groupby):
+        valid = (codes >= 0).all(axis=1)
+        self._cuboids = {}
+        self._cuboids[tuple(self.dimensions)] = self._group(codes[valid], values[valid],
+                                                           (~np.isnan(values[valid])).astype('float64'))
+        for dims in sets or []:
+            self.cuboid(dims)
+
+    def _group(self, codes: np.ndarray, sums: np.ndarray, filled: np.ndarray) -> tuple:
+        """Функция суммирует строки с одинаковыми кодами измерений.
+        Возвращает коды заполненных ячеек (в порядке возрастания), суммы
+        показателей и количество непустых значений в каждой ячейке."""
+        if codes.shape[1] == 0:
+            keys = np.zeros(len(codes), dtype=np.int64)
+        else:
+            shape = tuple(codes.max(axis=0) + 1) if len(codes) else (1,) * codes.shape[1]
+            keys = np.ravel_multi_index(tuple(codes.T), shape)
+        cells, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        totals = np.empty((len(cells), sums.shape[1]))
+        counts = np.empty_like(totals)
+        for i in range(sums.shape[1]):
+            totals[:, i] = np.bincount(inverse, weights=np.nan_to_num(sums[:, i]), minlength=len(cells))
+            counts[:, i] = np.bincount(inverse, weights=filled[:, i], minlength=len(cells))
+        return codes[first], totals, counts
+
+    def cuboid(self, dims) -> tuple:
+        """Функция возвращает агрегат (коды ячеек, суммы, количество значений)
+        для набора измерений dims. Агрегат сворачивается из наименьшего
+        кэшированного агрегата, содержащего все измерения dims."""
+        dims = tuple(dims)
+        if dims not in self._cuboids:
+            unknown = set(dims) - set(self.dimensions)
+            if unknown:
+                raise KeyError(f'Неизвестные измерения: {sorted(unknown)}')
+            source = min((key for key in self._cuboids if set(dims) <= set(key)),
+                         key=lambda key: len(self._cuboids[key][0]))
+            codes, sums, counts = self._cuboids[source]
+            self._cuboids[dims] = self._group(codes[:, [source.index(dim) for dim in dims]], sums, counts)
+        return self._cuboids[dims]
+
+    def aggregate(self, dims, where=None) -> pd.DataFrame:
+        """Функция возвращает суммы показателей по набору измерений dims
+        (аналог df.groupby(dims)[measures].sum().reset_index()).
+        where - словарь {измерение: значение} для отбора строк, например
+        {'country': 'Russian Federation'}.
+        Показатели групп выводятся, если измерения dims и where совпадают
+        со столбцами группы, аддитивные - также если входят в них."""
+        dims = list(dims)
+        where = where or {}
+        source = dims + [dim for dim in where if dim not in dims]
+        if where:
+            codes, sums, counts = self.cuboid(source)
+            keep = np.ones(len(codes), dtype=bool)
+            for dim, value in where.items():
+                keep &= codes[:, source.index(dim)] == self.levels[dim].get_loc(value)
+            codes, sums, counts = self._group(codes[keep][:, :len(dims)], sums[keep], counts[keep])
+        else:
+            codes, sums, counts = self.cuboid(dims)
+
+        result = pd.DataFrame({dim: self.levels[dim].take(codes[:, i]) for i, dim in enumerate(dims)})
+        # Сумма только пропусков - np.nan (аналог sum(min_count=1)):
+        totals = np.where(counts > 0, sums, np.nan)
+        for i, measure in enumerate(self.measures):
+            if measure in self.grains and not (set(source) == self.grains[measure] or
+                                               measure in self.additive and set(source) <= self.grains[measure]):
+                continue
+            column = totals[:, i]
+            # Целочисленные показатели без пропусков сохраняют исходный тип:
+            if pd.api.types.is_integer_dtype(self.dtypes[measure]) and (counts[:, i] > 0).all():
+                column = column.astype(self.dtypes[measure])
+            result[measure] = column
+        return result
+
+    def ratio(self, dims, numerator: str = 'suicides_no', denominator: str = 'population',
+              scale: float = 100_000, name: str = 'suicides/100kpop', where=None) -> pd.DataFrame:
+        """Функция возвращает суммы показателей по набору измерений dims
+        и относительный показатель name = numerator / denominator * scale
+        (по умолчанию - число самоубийств на 100 тыс. жителей)."""
+        result = self.aggregate(dims, where)
+        result[name] = result[numerator] / result[denominator] * scale
+        return result
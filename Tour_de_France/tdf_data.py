@@ -0,0 +1,30 @@
+"""Загрузка данных о победителях Tour de France (TidyTuesday) через локальный кэш
+(скачивание, проверка хэша и колоночный кэш - см. dataset_cache.py).
+"""
+
+import os
+
+import shared_modules  # noqa: F401 (подключает общие модули из корневого каталога)
+from dataset_cache import DatasetCache
+
+# Каталог с кэшем (исходные файлы - raw/<sha256>, колоночный кэш - columns/<sha256>/):
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Описание источников: адрес (исходный CSV-файл вместо HTML-страницы на GitHub),
+# ожидаемый хэш sha256 (None - не задан, при загрузке выводится предупреждение
+# с хэшем файла), функция чтения и ее параметры:
+SOURCES = {
+    'winners': {'url': 'https://raw.githubusercontent.com/rfordatascience/tidytuesday/master/'
+                       'data/2020/2020-04-07/tdf_winners.csv',
+                'sha256': None, 'reader': 'csv', 'options': {'parse_dates': ['start_date', 'born']}},
+}
+
+_cache = DatasetCache(SOURCES, CACHE_DIR)
+
+
+def load_dataset(name: str, mmap: bool = False):
+    """Функция возвращает данные источника name ('winners') в виде датафрейма.
+    Если mmap=True, числовые столбцы отображаются в память из кэша
+    и датафрейм доступен только для чтения."""
+    return _cache.load(name, mmap)
@@ -0,0 +1,210 @@
+"""Генераторы синтетических данных для замеров производительности.
+Каждый генератор воспроизводит структуру исходного набора данных проекта
+(имена и типы столбцов, формат значений) и принимает параметры:
+    scale - коэффициент объема данных (1, 10, 100);
+    seed - начальное состояние генератора случайных чисел
+           (одинаковые scale и seed дают одинаковые данные).
+"""
+
+import numpy as np
+import pandas as pd
+
+# Варианты ответов опроса разработчиков:
+COUNTRIES = ['United States', 'India', 'United Kingdom', 'Germany', 'Canada', 'France', 'Brazil',
+             'Poland', 'Netherlands', 'Russian Federation', 'Australia', 'Spain', 'Italy', 'Sweden',
+             'Ukraine', 'China', 'Israel', 'Switzerland', 'Turkey', 'Japan']
+EMPLOYMENT = ['Employed full-time', 'Employed part-time', 'Independent contractor, freelancer, or self-employed',
+              'Student', 'Not employed, but looking for work', 'Retired']
+ED_LEVELS = ['Bachelor’s degree (B.A., B.S., B.Eng., etc.)', 'Master’s degree (M.A., M.S., M.Eng., MBA, etc.)',
+             'Some college/university study without earning a degree', 'Secondary school',
+             'Other doctoral degree (Ph.D., Ed.D., etc.)', 'Associate degree (A.A., A.S., etc.)']
+NEW_LEARN = ['Every few months', 'Once a year', 'Once every few years', 'Once a decade']
+ORG_SIZES = ['Just me - I am a freelancer, sole proprietor, etc.', '2 to 9 employees', '10 to 19 employees',
+             '20 to 99 employees', '100 to 499 employees', '1,000 to 4,999 employees', '10,000 or more employees']
+DEV_TYPES = ['Developer, full-stack', 'Developer, back-end', 'Developer, front-end', 'Developer, mobile',
+             'Developer, desktop or enterprise applications', 'Data scientist or machine learning specialist',
+             'DevOps specialist', 'Engineering manager', 'Product manager', 'Academic researcher', 'Student']
+LANGUAGES = ['JavaScript', 'HTML/CSS', 'SQL', 'Python', 'Java', 'Bash/Shell/PowerShell', 'C#', 'TypeScript',
+             'PHP', 'C++', 'C', 'Go', 'Kotlin', 'Ruby', 'Rust', 'R', 'Swift', 'Scala']
+WEBFRAMES = ['jQuery', 'React.js', 'Angular', 'ASP.NET', 'Express', 'Spring', 'Vue.js', 'Django', 'Flask',
+             'Laravel', 'Ruby on Rails', 'Gatsby']
+DATABASES = ['MySQL', 'PostgreSQL', 'Microsoft SQL Server', 'SQLite', 'MongoDB', 'Redis', 'MariaDB',
+             'Oracle', 'Elasticsearch', 'Firebase', 'DynamoDB', 'Cassandra']
+MULTIPLE_ANSWERS = {'DevType': DEV_TYPES,
+                    'LanguageWorkedWith': LANGUAGES, 'LanguageDesireNextYear': LANGUAGES,
+                    'WebframeWorkedWith': WEBFRAMES, 'WebframeDesireNextYear': WEBFRAMES,
+                    'DatabaseWorkedWith': DATABASES, 'DatabaseDesireNextYear': DATABASES}
+
+# Возрастные группы и поколения для данных о самоубийствах:
+AGE_GROUPS = ['5-14 years', '15-24 years', '25-34 years', '35-54 years', '55-74 years', '75+ years']
+GENERATIONS = ['G.I. Generation', 'Silent', 'Boomers', 'Generation X', 'Millenials', 'Generation Z']
+
+# Названия месяцев в отчетах по скважинам:
+MONTH_NAMES = ['Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь', 'Июль', 'Август',
+               'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь']
+
+
+def _single_answers(rng, options: list, n: int, missing: float = 0.1) -> np.ndarray:
+    """Функция возвращает n ответов с одним вариантом (неравномерное
+    распределение по вариантам) и долей пропусков missing."""
+    weights = 1.0 / np.arange(1, len(options) + 1)
+    answers = np.asarray(options, dtype=object)[rng.choice(len(options), n, p=weights / weights.sum())]
+    answers[rng.random(n) < missing] = None
+    return answers
+
+
+def _multiple_answers(rng, options: list, n: int, missing: float = 0.1) -> np.ndarray:
+    """Функция возвращает n ответов с несколькими вариантами, разделенными ';'.
+    Строка ответа формируется один раз для каждого уникального набора вариантов."""
+    probabilities = 0.6 / np.arange(1, len(options) + 1) ** 0.7
+    chosen = rng.random((n, len(options))) < probabilities
+    codes = chosen @ (1 << np.arange(len(options), dtype=np.int64))
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    strings = np.array([';'.join(option for i, option in enumerate(options) if code >> i & 1) or None
+                        for code in uniques], dtype=object)
+    answers = strings[inverse]
+    answers[rng.random(n) < missing] = None
+    return answers
+
+
+def make_survey(scale: int = 1, seed: int = 0) -> pd.DataFrame:
+    """Функция возвращает данные опроса разработчиков в формате
+    'survey_results_public.csv' (10 тыс. респондентов при scale=1)."""
+    rng = np.random.default_rng(seed)
+    n = 10_000 * scale
+    df = pd.DataFrame({'Respondent': np.arange(1, n + 1)})
+    for col, options in [('Country', COUNTRIES), ('Employment', EMPLOYMENT), ('EdLevel', ED_LEVELS),
+                         ('NEWLearn', NEW_LEARN), ('OrgSize', ORG_SIZES)]:
+        df[col] = _single_answers(rng, options, n)
+    for col, options in MULTIPLE_ANSWERS.items():
+        df[col] = _multiple_answers(rng, options, n)
+    df['Age'] = np.where(rng.random(n) < 0.3, np.nan, rng.normal(31, 9, n).clip(12, 90).round())
+    for col in ['YearsCode', 'YearsCodePro']:
+        years = rng.gamma(2.0, 5.0, n).round().astype(int)
+        years = np.where(years < 1, 'Less than 1 year',
+                         np.where(years > 50, 'More than 50 years', years.astype(str))).astype(object)
+        years[rng.random(n) < 0.2] = None
+        df[col] = years
+    df['ConvertedComp'] = np.where(rng.random(n) < 0.45, np.nan, rng.lognormal(10.8, 0.9, n).round())
+    df['WorkWeekHrs'] = np.where(rng.random(n) < 0.35, np.nan, rng.normal(41, 7, n).clip(1, 100).round())
+    return df
+
+
+def make_market(scale: int = 1, seed: int = 0) -> dict:
+    """Функция возвращает ряды курсов доллара и евро, цен на нефть Brent и золото
+    в формате исходных файлов проекта Oil_Gold_ExRates (до 7500 наблюдений
+    в каждом ряду при scale=1). Период (1992-2019 гг.) не зависит от scale:
+    при scale > 1 интервал между наблюдениями уменьшается до 1/scale дня.
+    Часть наблюдений в каждом ряду пропущена (нерабочие дни бирж)."""
+    rng = np.random.default_rng(seed)
+    n = 10_000 * scale
+    dates = pd.Timestamp('1992-07-01') + pd.to_timedelta(np.arange(n) * (86_400 // scale), unit='s')
+
+    def walk(start: float, volatility: float, size: int) -> np.ndarray:
+        return (start * np.exp(np.cumsum(rng.normal(0, volatility, size)))).round(4)
+
+    def observed(share: float) -> np.ndarray:
+        return np.sort(rng.choice(n, int(n * share), replace=False))
+
+    series = {}
+    for name, start, label in [('dollar', 125.0, 'Доллар США'), ('euro', 25.0, 'Евро')]:
+        rows = observed(0.7)
+        series[name] = pd.DataFrame({'nominal': 1, 'Date': dates[rows], 'curs': walk(start, 0.01, len(rows)),
+                                     'cdx': label})
+    rows = observed(0.75)
+    close = walk(20.0, 0.02, len(rows))
+    series['brent'] = pd.DataFrame({'Ticker': 'ICE.BRN', 'PER': 'D', 'Date': dates[rows], 'Time': 0,
+                                    'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                                    'Vol': rng.integers(0, 100_000, len(rows))})
+    rows = observed(0.3)
+    series['gold'] = pd.DataFrame({'Date': dates[rows], 'Price': walk(300.0, 0.01, len(rows))})
+    return series
+
+
+def make_listenings(scale: int = 1, seed: int = 0) -> tuple:
+    """Функция возвращает данные Million Song Dataset: тройки
+    ('user_id', 'song_id', 'listenings') в формате '10000.txt' (200 тыс. строк
+    при scale=1) и данные о песнях в формате 'song_data.csv'
+    ('song_id', 'title', 'release', 'artist_name', 'year')."""
+    rng = np.random.default_rng(seed)
+    n_rows = 200_000 * scale
+    n_users, n_songs = max(n_rows // 26, 10), max(n_rows // 20, 10)
+    song_ids = np.array([f'SO{i:016X}' for i in range(n_songs)], dtype=object)
+    titles = np.array([f'Title {i}' for i in range(int(n_songs * 0.9))], dtype=object)
+    n_artists = max(n_songs // 12, 1)
+    songs = pd.DataFrame({'song_id': song_ids,
+                          'title': titles[rng.integers(0, len(titles), n_songs)],
+                          'release': np.array([f'Release {i}' for i in range(n_songs // 8 + 1)],
+                                              dtype=object)[np.arange(n_songs) // 8],
+                          'artist_name': np.array([f'Artist {i}' for i in range(n_artists)],
+                                                  dtype=object)[rng.zipf(1.5, n_songs) % n_artists],
+                          'year': np.where(rng.random(n_songs) < 0.4, 0, rng.integers(1950, 2011, n_songs))})
+    # Часть песен повторяется в базе с другими данными (как в исходном файле):
+    songs = pd.concat([songs, songs.sample(frac=0.01, random_state=seed).assign(year=0)], ignore_index=True)
+
+    # Пары "пользователь - песня" без повторов, популярность песен - по закону Ципфа:
+    users = rng.integers(0, n_users, n_rows)
+    song_codes = rng.zipf(1.2, n_rows) % n_songs
+    pairs = np.unique(users.astype(np.int64) * n_songs + song_codes)
+    user_ids = np.array([f'{i:040x}' for i in range(n_users)], dtype=object)
+    triples = pd.DataFrame({'user_id': user_ids[pairs // n_songs], 'song_id': song_ids[pairs % n_songs],
+                            'listenings': rng.geometric(0.3, len(pairs))})
+    return triples.sample(frac=1, random_state=seed).reset_index(drop=True), songs
+
+
+def make_well_report(n_months: int = 36, seed: int = 0) -> pd.DataFrame:
+    """Функция возвращает лист ежемесячного отчета по скважине в формате
+    'well_data.xlsx' (строки заголовков 0-2 не включаются): для каждого месяца
+    строки параметров 'Qн', 'Qж', 'Обв', 'Рзаб' с ежедневными значениями
+    (дробная часть отделяется запятой) и среднемесячным значением."""
+    rng = np.random.default_rng(seed)
+    qi, b, di, wpc = rng.uniform(40, 120), rng.uniform(0.2, 1.5), rng.uniform(0.002, 0.02), rng.uniform(100, 900)
+    start = rng.integers(0, 60)
+    rows = []
+    for month in range(n_months):
+        t = start + month * 31 + np.arange(31)
+        oil = qi / (1 + b * di * t) ** (1 / b) * rng.normal(1, 0.03, 31)
+        water_cut = np.clip(t / (t + wpc) * 100 + rng.normal(0, 1, 31), 0, 99)
+        values = {'Qн': oil, 'Qж': oil / (1 - water_cut / 100), 'Обв': water_cut, 'Рзаб': rng.normal(50, 5, 31)}
+        label = f'{MONTH_NAMES[month % 12]} {2015 + month // 12}'
+        for i, (parameter, daily) in enumerate(values.items()):
+            daily = np.where(rng.random(31) < 0.05, np.nan, daily)
+            text = [None if np.isnan(value) else f'{value:.2f}'.replace('.', ',') for value in daily]
+            rows.append([label if i == 0 else None, parameter, 'ЭЦН'] + text + [np.nanmean(daily)])
+    return pd.DataFrame(rows, columns=['Дата', 'Параметр', 'Режим'] + list(range(1, 32)) + ['Средн.'])
+
+
+def make_suicides(scale: int = 1, seed: int = 0) -> pd.DataFrame:
+    """Функция возвращает данные о самоубийствах в формате 'suicides_data.csv'
+    (около 28 тыс. строк при scale=1: 100 стран, 1985-2016 гг., 12 групп
+    по полу и возрасту)."""
+    rng = np.random.default_rng(seed)
+    n_countries = 100 * scale
+    countries = np.array([f'Country {i}' for i in range(n_countries)], dtype=object)
+    first_year = rng.integers(1985, 2000, n_countries)
+    last_year = rng.integers(2010, 2017, n_countries)
+    n_years = last_year - first_year + 1
+    # Строки "страна - год":
+    country = np.repeat(np.arange(n_countries), n_years)
+    year = first_year[country] + np.arange(len(country)) - np.repeat(np.cumsum(n_years) - n_years, n_years)
+    gdp = rng.lognormal(25, 1.5, len(country)).round()
+    hdi = np.where(year % 5 == 0, rng.uniform(0.4, 0.95, len(country)).round(3), np.nan)
+    # Строки "страна - год - пол - возраст":
+    groups = len(AGE_GROUPS) * 2
+    index = np.repeat(np.arange(len(country)), groups)
+    sex = np.tile(np.repeat(['male', 'female'], len(AGE_GROUPS)), len(country))
+    age = np.tile(np.arange(len(AGE_GROUPS)), 2 * len(country))
+    population = rng.integers(10_000, 5_000_000, len(index))
+    rate = np.where(sex == 'male', 3.5, 1.0) * (age + 1) * 3
+    suicides = rng.poisson(population * rate / 100_000)
+    generation = np.clip(5 - age - (year[index] - 1985) // 15 + 1, 0, len(GENERATIONS) - 1)
+    population_by_row = np.bincount(index, weights=population)
+    return pd.DataFrame({
+        'country': countries[country[index]], 'year': year[index], 'sex': sex,
+        'age': np.array(AGE_GROUPS, dtype=object)[age], 'suicides_no': suicides, 'population': population,
+        'suicides/100k pop': (suicides / population * 100_000).round(2),
+        'country-year': [f'{c}{y}' for c, y in zip(countries[country[index]], year[index])],
+        'HDI for year': hdi[index],
+        ' gdp_for_year ($) ': [f'{value:,.0f}' for value in gdp[index]],
+        'gdp_per_capita ($)': (gdp / population_by_row).round()[index].astype(int),
+        'generation': np.array(GENERATIONS, dtype=object)[generation]})
@@ -0,0 +1,286 @@
+"""Замеры производительности основных этапов обработки данных проектов
+на синтетических данных (см. generators.py) в нескольких масштабах.
+
+Для каждого этапа записывается время выполнения (минимум по repeat запускам)
+и пиковый объем памяти, выделенной за время этапа (отдельный запуск
+с tracemalloc). Результаты сохраняются в JSON-файл; при указании --baseline
+результаты сравниваются с ранее сохраненными, и замедление или рост
+потребления памяти более чем на --tolerance считается регрессией
+(код завершения 1).
+
+Пример запуска:
+    python benchmarks/run_benchmarks.py --scale 1 10 --output baseline.json
+    python benchmarks/run_benchmarks.py --scale 1 10 --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')  # Графики анализов не отображаются
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import generators
+
+# Каталоги проектов добавляются в путь поиска модулей:
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for project in ['Developer-survey', 'Oil_Gold_ExRates', 'Song_recommender', 'Oil_production', 'Suicide_rates']:
+    sys.path.insert(0, os.path.join(ROOT_DIR, project))
+
+
+class Benchmark:
+    """Замер этапов обработки данных. Результаты хранятся в словаре
+    {конвейер: {масштаб: {этап: {'seconds': ..., 'peak_mb': ...}}}}."""
+
+    def __init__(self, repeat: int = 1):
+        self.repeat = repeat
+        self.results = {}
+        self.stages = None  # словарь этапов текущего конвейера и масштаба
+
+    def start(self, pipeline: str, scale: int):
+        """Функция задает конвейер и масштаб для последующих замеров."""
+        self.stages = self.results.setdefault(pipeline, {}).setdefault(str(scale), {})
+
+    def run(self, stage: str, func, *args, **kwargs):
+        """Функция выполняет func(*args, **kwargs), записывает время и пиковый
+        объем памяти этапа stage и возвращает результат выполнения."""
+        seconds = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            seconds.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.stages[stage] = {'seconds': round(min(seconds), 6), 'peak_mb': round(peak / 2 ** 20, 3)}
+        print(f'  {stage:<28} {min(seconds):10.4f} с {peak / 2 ** 20:10.1f} МБ')
+        return result
+
+
+def fresh(df: pd.DataFrame) -> pd.DataFrame:
+    """Функция возвращает новый объект датафрейма без копирования данных,
+    чтобы этап выполнялся без результатов, кэшированных для исходного объекта."""
+    return df.copy(deep=False)
+
+
+def quiet(func):
+    """Функция возвращает обертку func без вывода на экран."""
+    def wrapper(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def bench_survey(bench: Benchmark, scale: int, seed: int, work_dir: str):
+    """Опрос разработчиков: загрузка, индекс ответов, агрегация и все анализы."""
+    from answer_index import AnswerIndex
+    from dev_survey_2020 import ANALYSES, USED_COLUMNS, income_by_cat, sort_multiple_answers
+    from survey_loader import SurveyReader, income_stats_by_cat, load_survey
+
+    path = os.path.join(work_dir, 'survey_results_public.csv')
+    generators.make_survey(scale, seed).to_csv(path, index=False)
+    df = bench.run('load', load_survey, path, USED_COLUMNS)
+    bench.run('income_stats_chunked', income_stats_by_cat, SurveyReader(path), 'Country')
+    bench.run('answer_index', AnswerIndex.from_source, df, 'LanguageWorkedWith')
+
+    def plot(func, **params):
+        func(fresh(df), **params)
+        plt.close('all')
+
+    bench.run('sort_multiple_answers', plot, sort_multiple_answers, cat='DevType', n_segments=20)
+    bench.run('income_by_cat', plot, income_by_cat, cat='Country')
+
+    def all_analyses():
+        source = fresh(df)
+        for analysis, params in ANALYSES:
+            analysis(source, **params)
+            plt.close('all')
+
+    bench.run('all_analyses', all_analyses)
+
+
+def bench_market(bench: Benchmark, scale: int, seed: int, work_dir: str):
+    """Курсы валют, нефть и золото: колоночный кэш, объединение рядов,
+    корреляция по периодам и скользящая, пошаговая проверка модели."""
+    import market_data
+    from online_model import walk_forward
+    from rolling_corr import regime_correlation, rolling_correlation
+    from time_join import join_on_date
+
+    # Синтетические ряды записываются в csv-файлы (дата и время в формате гггг-мм-дд-чч-мм-сс):
+    market_data.DATA_DIR = work_dir
+    market_data.CACHE_DIR = os.path.join(work_dir, '.cache')
+    market_data.SOURCES = {}
+    for name, df in generators.make_market(scale, seed).items():
+        df = df.assign(Date=df['Date'].dt.strftime('%Y%m%d%H%M%S'))
+        df.to_csv(os.path.join(work_dir, f'{name}.csv'), index=False)
+        market_data.SOURCES[name] = {'file': f'{name}.csv', 'date_column': 'Date', 'date_format': '%Y%m%d%H%M%S'}
+
+    def load_all():
+        return {name: market_data.load_series(name) for name in market_data.SOURCES}
+
+    def build_and_load():
+        shutil.rmtree(market_data.CACHE_DIR, ignore_errors=True)
+        return load_all()
+
+    bench.run('build_cache', build_and_load)
+    series = bench.run('load_cached', load_all)
+    dollar = series['dollar'].rename({'nominal': 'Dollar_nominal', 'curs': 'Dollar_rate'}, axis='columns')
+    euro = series['euro'].rename({'nominal': 'Euro_nominal', 'curs': 'Euro_rate'}, axis='columns')
+    brent = series['brent'].rename({'Close': 'Brent_close'}, axis='columns')[['Date', 'Brent_close']]
+    gold = series['gold'].rename({'Price': 'Gold_price'}, axis='columns')
+
+    data = bench.run('join', join_on_date, [dollar, euro, brent])
+    bench.run('join_asof', join_on_date, [dollar, gold], how='asof', tolerance='5D')
+    bench.run('regime_correlation', regime_correlation, data, ['Brent_close', 'Dollar_rate'],
+              breakpoints=['2008-01-01', '2018-01-01'])
+    bench.run('rolling_correlation', rolling_correlation, data, ['Brent_close', 'Dollar_rate', 'Euro_rate'], 250)
+    data = join_on_date([dollar, gold])
+    bench.run('walk_forward', walk_forward, data['Gold_price'], data['Dollar_rate'], len(data) // 2)
+
+
+def bench_songs(bench: Benchmark, scale: int, seed: int, work_dir: str):
+    """Рекомендации песен: объединение баз, рейтинг популярности, индексы,
+    методы Recommender и пакетный расчет рекомендаций."""
+    from batch_recommender import recommend_batch
+    from recommender import Recommender, SongIndex
+
+    triples, songs = generators.make_listenings(scale, seed)
+
+    def merge():
+        song_df = pd.merge(triples, songs.drop_duplicates(['song_id']), on='song_id', how='left')
+        song_df.loc[song_df['year'] == 0, 'year'] = np.nan
+        return song_df
+
+    def popularity(song_df):
+        popular_df = song_df.groupby(['artist_name', 'title']).agg({'listenings': 'sum'}).reset_index()
+        return popular_df.sort_values(by='listenings', ascending=False).reset_index(drop=True)
+
+    song_df = bench.run('merge', merge)
+    popular_df = bench.run('popularity', popularity, song_df)
+    index = bench.run('song_index', SongIndex, song_df, popular_df)
+    rec = Recommender(index, seed=seed)
+    # Пользователь со средней по объему историей прослушиваний:
+    user_id = index.users[np.argsort(np.diff(index.user_offsets))[len(index.users) // 2]]
+    bench.run('create_user', quiet(rec.create_user), user_id)
+    bench.run('by_popularity', quiet(rec.by_popularity), 1000)
+    for method in ['by_singers', 'by_release', 'by_similar_users', 'by_period']:
+        bench.run(method, quiet(getattr(rec, method)))
+    bench.run('recommend_batch', recommend_batch, index, index.users[:1000], workers=1)
+
+
+def bench_wells(bench: Benchmark, scale: int, seed: int, work_dir: str):
+    """Добыча нефти: загрузка отчетов по скважинам и подбор параметров кривых."""
+    from decline_fit import fit_wells
+    from well_data import load_well_reports
+
+    paths = []
+    for i in range(10 * scale):
+        path = os.path.join(work_dir, f'well_{i:04d}.xlsx')
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame([['Отчет по скважине'], [None], [None]]).to_excel(writer, index=False, header=False)
+            generators.make_well_report(36, seed + i).to_excel(writer, index=False, startrow=3)
+        paths.append(path)
+    wells = bench.run('load_reports', load_well_reports, paths)
+    bench.run('curve_fit', fit_wells, wells, workers=1)
+    params, _ = fit_wells(wells, workers=1)
+    bench.run('curve_fit_warm_start', fit_wells, wells, previous=params, workers=1)
+    bench.run('curve_fit_pool', fit_wells, wells)
+
+
+def bench_suicides(bench: Benchmark, scale: int, seed: int, work_dir: str):
+    """Самоубийства: загрузка, построение куба агрегатов и детализация."""
+    from rate_cube import RateCube, rollup
+
+    path = os.path.join(work_dir, 'suicides_data.csv')
+    generators.make_suicides(scale, seed).to_csv(path, index=False)
+    data = bench.run('load', pd.read_csv, path)
+    data.columns = data.columns.str.replace(' ', '').str.replace('$', '', regex=False).str.replace('()', '', regex=False)
+    data['gdp_for_year'] = pd.to_numeric(data['gdp_for_year'].str.replace(',', ''), errors='coerce')
+    dimensions = ['country', 'year', 'sex', 'age', 'generation']
+    country_year = ['country', 'year']
+    grain_measures = {'gdp_for_year': country_year, 'gdp_per_capita': country_year, 'HDIforyear': country_year}
+    cube = bench.run('cube_build', RateCube, data, dimensions, grain_measures=grain_measures,
+                     additive=['gdp_for_year'],
+                     sets=[['age'], ['sex'], ['generation'], ['year']] + rollup(country_year))
+    bench.run('cube_rates', lambda: [cube.ratio(dims) for dims in [['age'], ['sex'], ['generation'], ['year']]])
+    bench.run('cube_drilldown', cube.ratio, ['country', 'year', 'age'])
+    bench.run('groupby_drilldown', lambda: data.groupby(['country', 'year', 'age'])[['suicides_no', 'population']].sum())
+
+
+PIPELINES = {'survey': bench_survey, 'market': bench_market, 'songs': bench_songs,
+             'wells': bench_wells, 'suicides': bench_suicides}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_seconds: float = 0.01,
+            min_mb: float = 1.0) -> list:
+    """Функция сравнивает результаты с базовыми и возвращает список регрессий:
+    время или пиковая память этапа больше базовых значений более чем на tolerance
+    (незначительные абсолютные изменения - менее min_seconds и min_mb - не учитываются)."""
+    regressions = []
+    for pipeline, scales in results.items():
+        for scale, stages in scales.items():
+            for stage, current in stages.items():
+                base = baseline.get(pipeline, {}).get(scale, {}).get(stage)
+                if base is None:
+                    continue
+                for metric, threshold in [('seconds', min_seconds), ('peak_mb', min_mb)]:
+                    if (current[metric] > base[metric] * (1 + tolerance)
+                            and current[metric] - base[metric] > threshold):
+                        regressions.append(f'{pipeline} x{scale} {stage}: {metric} '
+                                           f'{base[metric]} -> {current[metric]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры производительности на синтетических данных')
+    parser.add_argument('--scale', nargs='+', type=int, default=[1], help='масштабы данных (1, 10, 100)')
+    parser.add_argument('--pipeline', nargs='+', choices=list(PIPELINES), default=list(PIPELINES),
+                        help='конвейеры обработки данных')
+    parser.add_argument('--repeat', type=int, default=3, help='количество запусков для замера времени')
+    parser.add_argument('--seed', type=int, default=0, help='начальное состояние генераторов данных')
+    parser.add_argument('--output', help='файл для сохранения результатов (JSON)')
+    parser.add_argument('--baseline', help='файл с базовыми результатами для сравнения (JSON)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение (доля)')
+    args = parser.parse_args()
+
+    bench = Benchmark(args.repeat)
+    for scale in args.scale:
+        for pipeline in args.pipeline:
+            print(f'{pipeline} x{scale}:')
+            bench.start(pipeline, scale)
+            with tempfile.TemporaryDirectory() as work_dir:
+                PIPELINES[pipeline](bench, scale, args.seed, work_dir)
+
+    report = {'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                       'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                       'repeat': args.repeat, 'seed': args.seed},
+              'results': bench.results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(bench.results, json.load(file)['results'], args.tolerance)
+        for line in regressions:
+            print('Регрессия:', line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Загрузка исходных данных проектов через локальный кэш.
+
+Файлы источников (реестр источников задается в модуле проекта) скачиваются
+один раз и хранятся в кэше под именем, равным хэшу sha256 содержимого.
+Хэш скачанного файла сверяется с указанным в реестре, несовпадение - ошибка.
+Если хэш в реестре не задан, выводится предупреждение с хэшем загруженного
+файла (его следует внести в реестр), а сам хэш записывается и используется
+для проверки последующих загрузок. Файл в кэше проверяется повторно перед
+построением колоночного кэша и при изменении его размера или времени изменения.
+
+При первой загрузке файл преобразуется в колоночный кэш: числовые столбцы
+в формате .npy, текстовые - коды значений и перечень уникальных значений.
+
+Без доступа к интернету (или для тестов) файлы можно загружать с зеркала:
+переменная окружения DATASET_MIRROR задает адрес каталога с копиями файлов,
+например 'file:///mnt/datasets/' или 'http://localhost:8000/'.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import urllib.request
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Функции чтения исходных файлов (поле 'reader' реестра источников):
+READERS = {'table': pd.read_table, 'csv': pd.read_csv}
+
+
+def file_hash(path: str) -> str:
+    """Функция вычисляет хэш sha256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Локальный кэш исходных данных проекта.
+    sources - реестр источников {имя: {'url': адрес файла, 'sha256': ожидаемый
+    хэш (None - не задан), 'reader': функция чтения из READERS, 'options':
+    параметры функции чтения}}, cache_dir - каталог кэша (исходные файлы -
+    raw/<sha256>, колоночный кэш - columns/<sha256>/)."""
+
+    def __init__(self, sources: dict, cache_dir: str):
+        self.sources = sources  # реестр источников
+        self.cache_dir = cache_dir  # каталог кэша
+
+    def _read_index(self) -> dict:
+        """Функция возвращает словарь {источник: {'sha256', 'size', 'mtime'}}
+        с описанием загруженных файлов."""
+        path = os.path.join(self.cache_dir, 'index.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def _write_index(self, index: dict):
+        """Функция записывает описание загруженных файлов."""
+        with open(os.path.join(self.cache_dir, 'index.json'), 'w', encoding='utf-8') as file:
+            json.dump(index, file)
+
+    def _record(self, index: dict, name: str, path: str):
+        """Функция записывает в описание хэш, размер и время изменения файла path."""
+        stat = os.stat(path)
+        index[name] = {'sha256': os.path.basename(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self._write_index(index)
+
+    def _source_url(self, name: str) -> str:
+        """Функция возвращает адрес файла источника name (с учетом зеркала)."""
+        url = self.sources[name]['url']
+        mirror = os.environ.get('DATASET_MIRROR')
+        return mirror.rstrip('/') + '/' + url.rsplit('/', 1)[-1] if mirror else url
+
+    def _is_intact(self, name: str, path: str, index: dict) -> bool:
+        """Функция проверяет, что файл path в кэше не изменился после загрузки.
+        Хэш вычисляется заново, только если размер или время изменения файла
+        отличаются от записанных."""
+        entry = index.get(name, {})
+        stat = os.stat(path)
+        if entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            return True
+        if file_hash(path) != os.path.basename(path):
+            return False
+        self._record(index, name, path)
+        return True
+
+    def fetch(self, name: str) -> str:
+        """Функция возвращает путь к исходному файлу источника name в кэше.
+        Файл скачивается, если его нет в кэше или он поврежден; хэш скачанного
+        файла сверяется с ожидаемым (ValueError при несовпадении)."""
+        index = self._read_index()
+        expected = self.sources[name]['sha256'] or index.get(name, {}).get('sha256')
+        raw_dir = os.path.join(self.cache_dir, 'raw')
+        if expected and os.path.exists(os.path.join(raw_dir, expected)):
+            path = os.path.join(raw_dir, expected)
+            if self._is_intact(name, path, index):
+                return path
+            # Поврежденный файл скачивается заново:
+            os.remove(path)
+
+        os.makedirs(raw_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        with urllib.request.urlopen(self._source_url(name)) as response, \
+                tempfile.NamedTemporaryFile(dir=raw_dir, delete=False) as file:
+            for block in iter(lambda: response.read(1 << 20), b''):
+                digest.update(block)
+                file.write(block)
+        digest = digest.hexdigest()
+        if expected and digest != expected:
+            os.remove(file.name)
+            raise ValueError(f'Хэш файла источника {name} ({digest}) не совпадает с ожидаемым ({expected})')
+        if not expected:
+            warnings.warn(f'Для источника {name} в реестре не задан хэш sha256, загруженный файл '
+                          f'не проверен; хэш загруженного файла: {digest}')
+        path = os.path.join(raw_dir, digest)
+        os.replace(file.name, path)
+        self._record(index, name, path)
+        return path
+
+    def build_cache(self, name: str, path: str, cache_path: str):
+        """Функция преобразует исходный файл path источника name в колоночный кэш.
+        Перед преобразованием хэш файла сверяется с его именем в кэше."""
+        digest = file_hash(path)
+        if digest != os.path.basename(path):
+            raise ValueError(f'Хэш файла источника {name} в кэше ({digest}) не совпадает с ожидаемым '
+                             f'({os.path.basename(path)})')
+        source = self.sources[name]
+        df = READERS[source['reader']](path, **source['options'])
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.makedirs(cache_path)
+        columns = []
+        for i, col in enumerate(df.columns):
+            column = df[col]
+            encoded = not (pd.api.types.is_numeric_dtype(column) or pd.api.types.is_datetime64_dtype(column))
+            if encoded:
+                codes, uniques = pd.factorize(column)
+                np.save(os.path.join(cache_path, f'{i}.npy'), codes.astype(np.int32))
+                np.save(os.path.join(cache_path, f'{i}_values.npy'), np.asarray(uniques, dtype=str))
+            else:
+                np.save(os.path.join(cache_path, f'{i}.npy'), column.to_numpy())
+            columns.append({'name': col, 'dtype': str(column.dtype), 'encoded': encoded})
+        # Файл с описанием записывается последним и служит признаком готовности кэша:
+        with open(os.path.join(cache_path, 'meta.json'), 'w', encoding='utf-8') as file:
+            json.dump({'columns': columns}, file, ensure_ascii=False)
+
+    def load(self, name: str, mmap: bool = False) -> pd.DataFrame:
+        """Функция возвращает данные источника name в виде датафрейма.
+        Файл скачивается и преобразуется в колоночный кэш при первом обращении.
+        Если mmap=True, числовые столбцы отображаются в память из кэша без
+        копирования и доступны только для чтения (изменение значений - ValueError),
+        иначе считываются в память."""
+        path = self.fetch(name)
+        cache_path = os.path.join(self.cache_dir, 'columns', os.path.basename(path))
+        meta_path = os.path.join(cache_path, 'meta.json')
+        if not os.path.exists(meta_path):
+            self.build_cache(name, path, cache_path)
+        with open(meta_path, encoding='utf-8') as file:
+            columns = json.load(file)['columns']
+        data = {}
+        for i, column in enumerate(columns):
+            values = np.load(os.path.join(cache_path, f'{i}.npy'), mmap_mode='r' if mmap else None)
+            if column['encoded']:
+                uniques = np.load(os.path.join(cache_path, f'{i}_values.npy'))
+                values = pd.Series(pd.Categorical.from_codes(values, uniques)).astype(column['dtype'])
+            data[column['name']] = values
+        return pd.DataFrame(data, copy=False)
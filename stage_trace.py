@@ -0,0 +1,176 @@
+"""Профилирование этапов обработки данных.
+
+Функции этапов отмечаются декоратором @stage, произвольный фрагмент кода -
+контекстным менеджером trace(). Для каждого вызова в файл трассировки
+записывается строка JSON: этап, родительский этап, скалярные аргументы
+(например, столбец cat), время выполнения, количество строк и объем памяти
+датафреймов на входе и на выходе, количество полных копий данных pandas
+за время этапа.
+
+Профилирование включается переменной окружения STAGE_TRACE (путь к файлу
+трассировки) или вызовом enable(path), например:
+    STAGE_TRACE=trace.jsonl python script.py
+При выключенном профилировании декоратор только проверяет флаг.
+Подсчет копий использует внутренний класс pandas и подключается только при
+включении профилирования; если класс недоступен (другая версия pandas),
+количество копий в трассировке не указывается (null).
+
+Модуль общий для всех проектов: модули проектов добавляют корневой каталог
+репозитория в путь поиска модулей.
+"""
+
+import functools
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Файл трассировки (None - профилирование выключено):
+_path = None
+# Стек выполняемых этапов и счетчик полных копий данных pandas
+# (None - подсчет копий недоступен):
+_stack = []
+_copies = None
+# Класс pandas, метод копирования которого заменяется на время профилирования,
+# и исходный метод:
+_block_manager = None
+_block_manager_copy = None
+
+
+def _counting_copy(self, *args, **kwargs):
+    """Копирование данных pandas с подсчетом полных (deep) копий."""
+    global _copies
+    if kwargs.get('deep', args[0] if args else True):
+        _copies += 1
+    return _block_manager_copy(self, *args, **kwargs)
+
+
+def enable(path: str):
+    """Функция включает профилирование с записью в файл path
+    (дочерние процессы наследуют настройку через переменную окружения)."""
+    global _path, _copies, _block_manager, _block_manager_copy
+    _path = path
+    os.environ['STAGE_TRACE'] = path
+    if _block_manager is None:
+        try:
+            from pandas.core.internals.managers import BaseBlockManager
+            _block_manager, _block_manager_copy = BaseBlockManager, BaseBlockManager.copy
+        except (ImportError, AttributeError):
+            return
+        _block_manager.copy = _counting_copy
+        _copies = 0
+
+
+def disable():
+    """Функция выключает профилирование."""
+    global _path, _copies, _block_manager
+    _path = None
+    os.environ.pop('STAGE_TRACE', None)
+    if _block_manager is not None:
+        _block_manager.copy = _block_manager_copy
+        _block_manager = None
+        _copies = None
+
+
+def _footprint(value) -> tuple:
+    """Функция возвращает количество строк и объем памяти (байт, без учета
+    содержимого строковых объектов) датафрейма, серии, массива или списка
+    датафреймов. Для остальных значений - (None, None)."""
+    if isinstance(value, pd.DataFrame):
+        return len(value), int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return len(value), int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray):
+        return len(value) if value.ndim else 1, int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        sizes = [_footprint(item) for item in value if isinstance(item, (pd.DataFrame, pd.Series))]
+        if sizes:
+            return sum(rows for rows, _ in sizes), sum(size for _, size in sizes)
+    return None, None
+
+
+class trace:
+    """Контекстный менеджер для профилирования фрагмента кода:
+        with trace('merge', [left, right]) as record:
+            result = pd.merge(left, right)
+            record.output = result
+    data - входные данные, params - словарь параметров этапа,
+    record.output - результат этапа."""
+
+    def __init__(self, name: str, data=None, params=None):
+        self.name = name
+        self.data = data
+        self.params = params
+        self.output = None
+
+    def __enter__(self):
+        if _path is not None:
+            self.parent = _stack[-1] if _stack else None
+            _stack.append(self.name)
+            self.copies = _copies
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if _path is None or not _stack or _stack[-1] != self.name:
+            return False
+        seconds = time.perf_counter() - self.start
+        _stack.pop()
+        rows_in, bytes_in = _footprint(self.data)
+        rows_out, bytes_out = _footprint(self.output)
+        record = {'stage': self.name, 'parent': self.parent, 'params': self.params,
+                  'pid': os.getpid(), 'time': time.time(),
+                  'seconds': round(seconds, 6), 'rows_in': rows_in, 'rows_out': rows_out,
+                  'bytes_in': bytes_in, 'bytes_out': bytes_out,
+                  'copies': _copies - self.copies if _copies is not None else None,
+                  'error': exc_type.__name__ if exc_type else None}
+        with open(_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return False
+
+
+def _arguments(arguments: dict) -> tuple:
+    """Функция возвращает первый аргумент вызова с данными (датафрейм,
+    серия, массив или список датафреймов) и словарь скалярных аргументов."""
+    data = next((value for value in arguments.values() if _footprint(value)[0] is not None), None)
+    params = {key: value for key, value in arguments.items()
+              if isinstance(value, (str, int, float, bool))}
+    return data, params
+
+
+def stage(func=None, *, name: str = None):
+    """Декоратор профилирования функции как этапа обработки данных
+    (имя этапа по умолчанию - имя функции): @stage или @stage(name='...')."""
+    if func is None:
+        return functools.partial(stage, name=name)
+    label = name or func.__qualname__
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _path is None:
+            return func(*args, **kwargs)
+        data, params = _arguments(signature.bind_partial(*args, **kwargs).arguments)
+        with trace(label, data, params) as record:
+            record.output = func(*args, **kwargs)
+        return record.output
+    return wrapper
+
+
+def summary(path: str) -> pd.DataFrame:
+    """Функция возвращает сводку по файлу трассировки path: количество вызовов,
+    суммарное и максимальное время, количество копий данных по этапам
+    (NaN, если подсчет копий был недоступен)."""
+    records = pd.read_json(path, lines=True)
+    return (records.groupby('stage')
+            .agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'), max_seconds=('seconds', 'max'),
+                 rows_in=('rows_in', 'max'), rows_out=('rows_out', 'max'),
+                 copies=('copies', lambda copies: copies.sum(min_count=1)))
+            .sort_values('seconds', ascending=False))
+
+
+if os.environ.get('STAGE_TRACE'):
+    enable(os.environ['STAGE_TRACE'])